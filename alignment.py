@@ -0,0 +1,50 @@
+"""Aligning fetched close prices into the frame the analysis stages share.
+
+Tickers rarely have the same history: a coin listed last month leaves NaN
+over the rest of the universe's history. ``align_prices`` decides what
+happens to those rows:
+
+* ``'common'`` keeps only timestamps where every ticker has a price, as
+  ``fetch_data`` always has;
+* ``'pairwise'`` keeps each ticker's own valid range (gaps inside it are
+  forward-filled) so a late listing only shortens that ticker's history.
+  Stages then use the rows the assets they combine share: pair tests run on
+  each pair's overlap, covariances are pairwise-complete, and the
+  walk-forward, Ledoit-Wolf and parameter sweep use the jointly observed
+  rows.
+
+The aligned prices live in one contiguous column-major block, float32 with
+``float32=True``, so pandas wraps them without another copy.
+"""
+import numpy as np
+import pandas as pd
+
+POLICIES = ('common', 'pairwise')
+
+
+def align_prices(prices, policy='common', float32=False):
+    """``prices`` (timestamps x tickers, NaN where missing) aligned under ``policy``."""
+    if policy == 'common':
+        prices = prices.dropna()
+    elif policy == 'pairwise':
+        # Forward-fill inside each ticker's valid range only, leaving NaN before
+        # its first price and after its last.
+        prices = prices.ffill().where(prices.bfill().notna()).dropna(how='all')
+    else:
+        raise ValueError(f"Unknown alignment policy: {policy} (use one of {', '.join(POLICIES)})")
+    values = np.asfortranarray(prices.to_numpy(dtype=np.float32 if float32 else np.float64))
+    return pd.DataFrame(values, index=prices.index, columns=prices.columns, copy=False)
+
+
+def valid_ranges(values):
+    """Row range ``[first, stop)`` with prices, per column of a 2-D array (``(0, 0)`` if none)."""
+    valid = ~np.isnan(values)
+    has_any = valid.any(axis=0)
+    first = np.where(has_any, valid.argmax(axis=0), 0)
+    stop = np.where(has_any, len(values) - valid[::-1].argmax(axis=0), 0)
+    return first, stop
+
+
+def bar_returns(prices):
+    """Simple returns from each bar to the next; NaN where either price is missing."""
+    return prices.pct_change(fill_method=None).iloc[1:]
@@ -1,16 +1,28 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Dict, Any, Optional
+import os
+import time
 import traceback
-from crypto_quantlab import CryptoQuantLab
-import pandas as pd
-import numpy as np
+from crypto_quantlab import CryptoQuantLab, STAGE_REQUIRES, STAGES, run_frontier, run_risk, run_stages
+from bars import interval_seconds
+import encoding
+from instrumentation import METRICS
+from jobs import JobRunner, Overloaded
+from price_store import PriceStore, CSVSource
+from result_cache import ResultCache, stage_key, stage_keys
 import uvicorn
 
 class AnalysisRequest(BaseModel):
     cryptos: List[str] = Field(..., min_items=2, max_items=10)
     timeframe: str = Field("1y", pattern="^(3mo|6mo|1y|2y|5y)$")
+    interval: str = Field("1d", pattern="^(1m|5m|15m|1h|1d)$")
+    alignment: str = Field("common", pattern="^(common|pairwise)$")
+    max_simulations: int = Field(10000, ge=100, le=100000)
+    ci_half_width: Optional[float] = Field(0.01, gt=0, lt=0.5)
+    profile: bool = False
 
 class QuickAnalysisRequest(BaseModel):
     cryptos: List[str] = Field(..., min_items=2, max_items=5)
@@ -19,11 +31,84 @@ class QuickAnalysisRequest(BaseModel):
 class HistoricalDataRequest(BaseModel):
     cryptos: List[str] = Field(..., min_items=1, max_items=10)
     timeframe: str = Field("1y", pattern="^(3mo|6mo|1y|2y|5y)$")
+    interval: str = Field("1d", pattern="^(1m|5m|15m|1h|1d)$")
+    format: str = Field("rows", pattern="^(rows|columnar)$")
+    max_points: Optional[int] = Field(None, ge=3, le=100000)
+    float32: bool = False
+
+class FrontierRequest(BaseModel):
+    cryptos: List[str] = Field(..., min_items=2, max_items=20)
+    timeframe: str = Field("1y", pattern="^(3mo|6mo|1y|2y|5y)$")
+    interval: str = Field("1d", pattern="^(1m|5m|15m|1h|1d)$")
+    alignment: str = Field("common", pattern="^(common|pairwise)$")
+    n_points: int = Field(100, ge=2, le=500)
+    shrinkage: Optional[str] = Field(None, pattern="^ledoit_wolf$")
+    bounds: List[float] = Field([0.0, 1.0], min_items=2, max_items=2)
+    asset_bounds: Optional[Dict[str, List[float]]] = None
+    groups: Optional[Dict[str, Dict[str, Any]]] = None
+    max_turnover: Optional[float] = Field(None, ge=0)
+    current_weights: Optional[Dict[str, float]] = None
+
+class RiskRequest(BaseModel):
+    cryptos: List[str] = Field(..., min_items=2, max_items=20)
+    timeframe: str = Field("1y", pattern="^(3mo|6mo|1y|2y|5y)$")
+    interval: str = Field("1d", pattern="^(1m|5m|15m|1h|1d)$")
+    alignment: str = Field("common", pattern="^(common|pairwise)$")
+    method: str = Field("student_t", pattern="^(normal|student_t|bootstrap)$")
+    n_paths: int = Field(100000, ge=1000, le=1000000)
+    horizon: Optional[int] = Field(None, ge=1, le=10000)
+    garch: bool = False
+    dof: float = Field(5.0, gt=2, le=100)
+    block_size: int = Field(1, ge=1, le=100)
+    confidence: List[float] = Field([0.95, 0.99], min_items=1, max_items=5)
+    seed: Optional[int] = None
+
+class ArbitrageMonitorRequest(BaseModel):
+    cryptos: List[str] = Field(..., min_items=2, max_items=50)
+    pairs: Optional[List[List[str]]] = None
+    timeframe: str = Field("1y", pattern="^(3mo|6mo|1y|2y|5y)$")
+    interval: str = Field("1d", pattern="^(1m|5m|15m|1h|1d)$")
+    alignment: str = Field("common", pattern="^(common|pairwise)$")
+    method: str = Field("kalman", pattern="^(kalman|ewma)$")
+    z_entry: float = Field(2.0, gt=0)
+    z_exit: float = Field(0.5, ge=0)
+    halflife: float = Field(100, gt=0)
+    warmup_bars: Optional[int] = Field(None, ge=1)
+    speed: Optional[float] = Field(None, gt=0)
+
+class ORJSONResponse(JSONResponse):
+    """JSON rendered by encoding.dumps: orjson with native NumPy when installed, NaN/inf as null."""
+    def render(self, content):
+        return encoding.dumps(content)
+
+def respond(result):
+    return result if isinstance(result, Response) else ORJSONResponse(result)
+
+PROFILING_ENABLED = os.environ.get("CRYPTO_QUANTLAB_PROFILING", "") not in ("", "0")
+# Progress events kept per stage of a background job; rounds in between are skipped.
+PROGRESS_STEPS = 20
+
+def check_profiling(request):
+    if request.profile and not PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled; set CRYPTO_QUANTLAB_PROFILING=1")
+
+def record_timings(lab, started):
+    """Fold a lab's stage timings into the metrics and return them with the request total."""
+    for stage, timing in lab.timings.items():
+        METRICS.record_stage(stage, timing)
+    return {**lab.timings, "total_seconds": time.perf_counter() - started}
+
+price_store = PriceStore(
+    source=CSVSource(os.environ['CRYPTO_QUANTLAB_CSV_DIR']) if 'CRYPTO_QUANTLAB_CSV_DIR' in os.environ else None
+)
+result_cache = ResultCache()
+job_runner = JobRunner()
 
 app = FastAPI(
     title="Crypto QuantLab API",
     description="Quantitative analysis for cryptocurrency markets",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -34,24 +119,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def serialize_numpy(obj):
-    if isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, pd.Timestamp):
-        return obj.isoformat()
-    return obj
-
-def clean_results(data):
-    if isinstance(data, dict):
-        return {k: clean_results(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [clean_results(item) for item in data]
-    else:
-        return serialize_numpy(data)
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    METRICS.observe("http_request_duration_seconds", elapsed, help="API request latency.",
+                    method=request.method, path=getattr(route, "path", "unmatched"),
+                    status=str(response.status_code))
+    response.headers["Server-Timing"] = f"app;dur={elapsed * 1000:.1f}"
+    return response
+
+@app.on_event("startup")
+async def start_job_reaper():
+    job_runner.start_reaper()
+
+@app.on_event("shutdown")
+def shutdown_job_runner():
+    job_runner.shutdown()
+
+async def submit_job(key, job, *args):
+    try:
+        return await job_runner.run(key, job, *args)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def compute_stages(lab, stage_kwargs, profile=False):
+    """Stage results from the cache, with the stages that missed run in one worker process.
+
+    Stages that read a recomputed stage's results are rerun with it; cached
+    results seed the rest. Stage timings land in ``lab.timings``. A profiled
+    run skips the cache lookup and also returns the profiler report.
+    """
+    keys = stage_keys(lab, STAGES, stage_kwargs, STAGE_REQUIRES)
+    results = {} if profile else {stage: result_cache.get(stage, key) for stage, key in keys.items()}
+    missed = []
+    for stage in STAGES:
+        if results.get(stage) is None or any(required in missed for required in STAGE_REQUIRES.get(stage, ())):
+            missed.append(stage)
+    cached = {stage: result for stage, result in results.items() if stage not in missed}
+    lab.timings.update({stage: {"cached": True} for stage in cached})
+    report = None
+    if missed:
+        results, timings, report = await job_runner.run_in_process(
+            run_stages, lab.data, lab.period, tuple(missed), stage_kwargs, cached, interval=lab.interval,
+            profile=profile
+        )
+        lab.timings.update(timings)
+        for stage in missed:
+            if stage in results:
+                result_cache.put(keys[stage], results[stage], bar_seconds=interval_seconds(lab.interval))
+    return results, report
 
 @app.get("/")
 async def root():
@@ -61,11 +184,28 @@ async def root():
         "health": "/api/health"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    cache, jobs = result_cache.stats(), job_runner.stats()
+    collected = [
+        ("cache_entries", "gauge", "Entries in the result cache.", {}, cache["entries"]),
+        ("cache_bytes", "gauge", "Approximate size of the result cache.", {}, cache["bytes"]),
+        ("jobs_in_flight", "gauge", "Distinct analyses queued or running.", {}, jobs["in_flight"]),
+        ("background_jobs", "gauge", "Background jobs not yet finished.", {}, jobs["background_jobs"]),
+    ]
+    for outcome in ("hits", "misses"):
+        collected += [(f"cache_{outcome}_total", "counter", f"Result cache {outcome} by stage.", {"stage": stage},
+                       counters[outcome]) for stage, counters in sorted(cache["stages"].items())]
+    return PlainTextResponse(METRICS.render(collected), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/health")
 async def health_check():
     return {
         "status": "running",
-        "message": "All systems operational"
+        "message": "All systems operational",
+        "cache": result_cache.stats(),
+        "jobs": job_runner.stats()
     }
 
 @app.get("/api/available-cryptos")
@@ -81,125 +221,143 @@ async def get_available_cryptos():
         "total_count": len(cryptos)
     }
 
-@app.post("/api/analyze")
-async def run_analysis(request: AnalysisRequest):
-    try:
-        lab = CryptoQuantLab()
-        lab.cryptos = request.cryptos
+STAGE_FALLBACKS = {
+    "cointegration": {
+        "cointegration_probability": 0.0, 
+        "mcmc_simulations": 0, 
+        "arbitrage_opportunities": []
+    },
+    "strategies": {
+        "momentum_sharpe": 0.0, 
+        "mean_reversion_sharpe": 0.0, 
+        "combined_sharpe": 0.0
+    },
+    "portfolio": {
+        "sharpe_ratio": 0.0, 
+        "expected_return": 0.0, 
+        "volatility": 0.0, 
+        "optimal_weights": {}
+    },
+    "backtest": {
+        "total_return": 0.0, 
+        "annualized_return": 0.0,
+        "sharpe_ratio": 0.0, 
+        "max_drawdown": 0.0, 
+        "win_rate": 0.0,
+        "volatility": 0.0,
+        "total_trades": 0,
+        "total_costs": 0.0,
+        "annual_turnover": 0.0
+    },
+    "arbitrage": {
+        "total_pairs_analyzed": 0, 
+        "active_opportunities": 0, 
+        "total_opportunity_value": 0.0
+    }
+}
 
-        # Fetch data
-        try:
-            data = lab.fetch_data(period=request.timeframe)
-            if data is None or data.empty:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Couldn't fetch data for those cryptocurrencies"
-                )
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Data issue: {str(e)}")
-
-        # Cointegration analysis
-        try:
-            cointegration_results = lab.cointegration_analysis()
-        except Exception as e:
-            cointegration_results = {
-                "cointegration_probability": 0.0, 
-                "mcmc_simulations": 10000, 
-                "arbitrage_opportunities": []
-            }
+def stage_summary(stage, result):
+    """Response section for one stage, falling back to zeros when it failed."""
+    result = result if result is not None else STAGE_FALLBACKS[stage]
+    if stage == "cointegration":
+        return {
+            "is_cointegrated": result.get('is_cointegrated', False),
+            "johansen_trace_statistic": result.get('johansen_trace_statistic', 0.0),
+            "johansen_critical_value_95": result.get('johansen_critical_value_95', 0.0),
+            "cointegration_probability": result.get('cointegration_probability', 0.0),
+            "mcmc_simulations": result.get('mcmc_simulations', 0),
+            "probability_interval": result.get('probability_interval', [0.0, 1.0]),
+            "arbitrage_pairs_found": len(result.get('arbitrage_opportunities', []))
+        }
+    if stage == "strategies":
+        return {
+            "momentum_sharpe": result.get('momentum_sharpe', 0.0),
+            "mean_reversion_sharpe": result.get('mean_reversion_sharpe', 0.0),
+            "combined_sharpe": result.get('combined_sharpe', 0.0)
+        }
+    if stage == "portfolio":
+        return {
+            "optimal_sharpe": result.get('sharpe_ratio', 0.0),
+            "expected_return": result.get('expected_return', 0.0),
+            "volatility": result.get('volatility', 0.0),
+            "optimal_weights": result.get('optimal_weights', {})
+        }
+    if stage == "backtest":
+        return {
+            "total_return": result.get('total_return', 0.0),
+            "annualized_return": result.get('annualized_return', 0.0),
+            "sharpe_ratio": result.get('sharpe_ratio', 0.0),
+            "max_drawdown": result.get('max_drawdown', 0.0),
+            "win_rate": result.get('win_rate', 0.0),
+            "volatility": result.get('volatility', 0.0),
+            "total_trades": result.get('total_trades', 0),
+            "total_costs": result.get('total_costs', 0.0),
+            "annual_turnover": result.get('annual_turnover', 0.0)
+        }
+    return {
+        "total_pairs_analyzed": result.get('total_pairs_analyzed', 0),
+        "active_opportunities": result.get('active_opportunities', 0),
+        "total_opportunity_value": result.get('total_opportunity_value', 0.0)
+    }
 
-        # Strategy results
-        try:
-            strategy_results = lab.systematic_strategies()
-        except Exception as e:
-            strategy_results = {
-                "momentum_sharpe": 0.0, 
-                "mean_reversion_sharpe": 0.0, 
-                "combined_sharpe": 0.0
-            }
+def data_summary(lab, request):
+    has_data = lab.data is not None and len(lab.data) > 0
+    return {
+        "assets_analyzed": len(lab.data.columns) if lab.data is not None else 0,
+        "time_period": request.timeframe,
+        "total_observations": len(lab.data) if lab.data is not None else 0,
+        "date_range": {
+            "start": lab.data.index[0].isoformat() if has_data else None,
+            "end": lab.data.index[-1].isoformat() if has_data else None
+        }
+    }
 
-        # Portfolio optimization
-        try:
-            portfolio_results = lab.portfolio_optimization()
-        except Exception as e:
-            portfolio_results = {
-                "sharpe_ratio": 0.0, 
-                "expected_return": 0.0, 
-                "volatility": 0.0, 
-                "optimal_weights": {}
-            }
+def analysis_stage_kwargs(request: AnalysisRequest):
+    return {
+        "cointegration": {
+            "n_simulations": request.max_simulations,
+            "ci_half_width": request.ci_half_width
+        }
+    }
 
-        # Backtest
-        try:
-            backtest_results = lab.comprehensive_backtest()
-        except Exception as e:
-            backtest_results = {
-                "total_return": 0.0, 
-                "annualized_return": 0.0,
-                "sharpe_ratio": 0.0, 
-                "max_drawdown": 0.0, 
-                "win_rate": 0.0,
-                "volatility": 0.0
-            }
+async def fetch_lab(request):
+    lab = CryptoQuantLab(store=price_store, cache=result_cache, alignment=request.alignment)
+    lab.cryptos = request.cryptos
+    try:
+        data = await job_runner.run_in_thread(lab.fetch_data, period=request.timeframe, interval=request.interval)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Data issue: {str(e)}")
+    if data is None or data.empty:
+        raise HTTPException(
+            status_code=400,
+            detail="Couldn't fetch data for those cryptocurrencies"
+        )
+    return lab
 
-        # Arbitrage
-        try:
-            arbitrage_results = lab.quantify_cointegration_arbitrage()
-        except Exception as e:
-            arbitrage_results = {
-                "total_pairs_analyzed": 0, 
-                "active_opportunities": 0, 
-                "total_opportunity_value": 0.0
-            }
+@app.post("/api/analyze")
+async def run_analysis(request: AnalysisRequest):
+    check_profiling(request)
+    key = ("analyze", tuple(request.cryptos), request.timeframe, request.interval, request.alignment,
+           request.max_simulations, request.ci_half_width, request.profile)
+    return respond(await submit_job(key, _run_analysis, request))
+
+async def _run_analysis(request: AnalysisRequest):
+    started = time.perf_counter()
+    try:
+        lab = await fetch_lab(request)
+        stage_results, profile = await compute_stages(lab, analysis_stage_kwargs(request), profile=request.profile)
 
-        # Build response
         response_data = {
             "status": "success",
-            "data_analysis": {
-                "assets_analyzed": len(request.cryptos),
-                "time_period": request.timeframe,
-                "total_observations": len(lab.data) if hasattr(lab, 'data') and lab.data is not None else 0,
-                "date_range": {
-                    "start": lab.data.index[0].isoformat() if hasattr(lab, 'data') and lab.data is not None and len(lab.data) > 0 else None,
-                    "end": lab.data.index[-1].isoformat() if hasattr(lab, 'data') and lab.data is not None and len(lab.data) > 0 else None
-                }
-            },
-            "cointegration": {
-                "is_cointegrated": cointegration_results.get('is_cointegrated', False),
-                "johansen_trace_statistic": cointegration_results.get('johansen_trace_statistic', 0.0),
-                "johansen_critical_value_95": cointegration_results.get('johansen_critical_value_95', 0.0),
-                "cointegration_probability": cointegration_results.get('cointegration_probability', 0.0),
-                "mcmc_simulations": cointegration_results.get('mcmc_simulations', 10000),
-                "arbitrage_pairs_found": len(cointegration_results.get('arbitrage_opportunities', []))
-            },
-            "strategies": {
-                "momentum_sharpe": strategy_results.get('momentum_sharpe', 0.0),
-                "mean_reversion_sharpe": strategy_results.get('mean_reversion_sharpe', 0.0),
-                "combined_sharpe": strategy_results.get('combined_sharpe', 0.0)
-            },
-            "portfolio": {
-                "optimal_sharpe": portfolio_results.get('sharpe_ratio', 0.0),
-                "expected_return": portfolio_results.get('expected_return', 0.0),
-                "volatility": portfolio_results.get('volatility', 0.0),
-                "optimal_weights": portfolio_results.get('optimal_weights', {})
-            },
-            "backtest": {
-                "total_return": backtest_results.get('total_return', 0.0),
-                "annualized_return": backtest_results.get('annualized_return', 0.0),
-                "sharpe_ratio": backtest_results.get('sharpe_ratio', 0.0),
-                "max_drawdown": backtest_results.get('max_drawdown', 0.0),
-                "win_rate": backtest_results.get('win_rate', 0.0),
-                "volatility": backtest_results.get('volatility', 0.0)
-            },
-            "arbitrage": {
-                "total_pairs_analyzed": arbitrage_results.get('total_pairs_analyzed', 0),
-                "active_opportunities": arbitrage_results.get('active_opportunities', 0),
-                "total_opportunity_value": arbitrage_results.get('total_opportunity_value', 0.0)
-            }
+            "data_analysis": data_summary(lab, request)
         }
+        for stage in STAGES:
+            response_data[stage] = stage_summary(stage, stage_results.get(stage))
+        response_data["timings"] = record_timings(lab, started)
+        if profile is not None:
+            response_data["profile"] = profile
 
-        cleaned_data = clean_results(response_data)
-        return cleaned_data
+        return response_data
 
     except HTTPException:
         raise
@@ -211,10 +369,120 @@ async def run_analysis(request: AnalysisRequest):
             detail=f"Analysis failed: {str(e)}"
         )
 
+async def _analysis_job(job, request: AnalysisRequest):
+    """Run the analysis stage by stage, emitting each section as it finishes."""
+    started = time.perf_counter()
+    lab = await fetch_lab(request)
+    job.emit("data_analysis", data_summary(lab, request))
+
+    stage_kwargs = analysis_stage_kwargs(request)
+    response_data = {"status": "success", "data_analysis": data_summary(lab, request)}
+    stage_results = {}
+    profiles = {}
+    keys = stage_keys(lab, STAGES, stage_kwargs, STAGE_REQUIRES)
+    recomputed = set()
+    for stage, key in keys.items():
+        rerun = request.profile or any(required in recomputed for required in STAGE_REQUIRES.get(stage, ()))
+        result = None if rerun else result_cache.get(stage, key)
+        if result is not None:
+            lab.timings[stage] = {"cached": True}
+        else:
+            recomputed.add(stage)
+            progress_queue, reporter = job_runner.progress_channel()
+            reported_step = -1
+
+            def on_progress(done, total, hits):
+                # At most PROGRESS_STEPS progress events per stage, however many rounds it reports.
+                nonlocal reported_step
+                step = done * PROGRESS_STEPS // total if total else PROGRESS_STEPS
+                if step == reported_step:
+                    return
+                reported_step = step
+                job.emit("progress", {"stage": stage, "completed": done, "total": total,
+                                      "probability": hits / done if done else 0.0})
+
+            computed, timings, profile = await job_runner.run_reporting(
+                progress_queue, on_progress, run_stages, lab.data, lab.period, (stage,),
+                stage_kwargs, stage_results, reporter, interval=lab.interval, profile=request.profile
+            )
+            lab.timings.update(timings)
+            if profile is not None:
+                profiles[stage] = profile
+            result = computed.get(stage)
+            if result is not None:
+                result_cache.put(key, result, bar_seconds=interval_seconds(lab.interval))
+        if result is not None:
+            stage_results[stage] = result
+        response_data[stage] = stage_summary(stage, result)
+        job.emit(stage, response_data[stage])
+    response_data["timings"] = record_timings(lab, started)
+    job.emit("timings", response_data["timings"])
+    if profiles:
+        response_data["profile"] = profiles
+    return response_data
+
+@app.post("/api/jobs", status_code=202)
+async def submit_analysis_job(request: AnalysisRequest):
+    check_profiling(request)
+    try:
+        job = job_runner.start("analyze", _analysis_job, request, params=request.model_dump())
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events"
+    }
+
+def get_job_or_404(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    return respond(get_job_or_404(job_id).snapshot())
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    get_job_or_404(job_id)
+    return {"job_id": job_id, "cancelled": job_runner.cancel(job_id)}
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-Sent Events: one event per stage result, progress and the final status."""
+    job = get_job_or_404(job_id)
+
+    async def events():
+        seen = 0
+        while True:
+            job.touch()
+            for event in job.events[seen:]:
+                yield f"event: {event['event']}\ndata: {encoding.dumps(event['data']).decode()}\n\n"
+            seen = len(job.events)
+            if job.finished:
+                break
+            if not await job.wait(seen, timeout=15):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
 @app.post("/api/quick-analysis")
 async def quick_analysis(request: QuickAnalysisRequest):
+    key = ("quick-analysis", tuple(request.cryptos), request.timeframe)
+    return respond(await submit_job(key, job_runner.run_in_thread, _quick_analysis, request))
+
+def _quick_analysis(request: QuickAnalysisRequest):
+    started = time.perf_counter()
     try:
-        lab = CryptoQuantLab()
+        lab = CryptoQuantLab(store=price_store, cache=result_cache)
         lab.cryptos = request.cryptos
 
         price_data = lab.fetch_data(period=request.timeframe)
@@ -235,8 +503,9 @@ async def quick_analysis(request: QuickAnalysisRequest):
                 "average_volatility": float(returns.std().mean()),
                 "best_performer": returns.mean().idxmax(),
                 "worst_performer": returns.mean().idxmin(),
-                "correlation_matrix": clean_results(returns.corr().to_dict())
-            }
+                "correlation_matrix": returns.corr().to_dict()
+            },
+            "timings": record_timings(lab, started)
         }
 
         return results
@@ -247,31 +516,133 @@ async def quick_analysis(request: QuickAnalysisRequest):
             detail=f"Quick analysis failed: {str(e)}"
         )
 
+@app.post("/api/frontier")
+async def get_frontier(request: FrontierRequest):
+    key = ("frontier", request.model_dump_json())
+    return respond(await submit_job(key, _frontier, request))
+
+async def _frontier(request: FrontierRequest):
+    """Fetch on the thread pool, then solve the frontier on the process pool from cached moments."""
+    started = time.perf_counter()
+    lab = await fetch_lab(request)
+
+    constraints = {"bounds": request.bounds}
+    if request.asset_bounds:
+        constraints["asset_bounds"] = request.asset_bounds
+    if request.groups:
+        constraints["groups"] = request.groups
+    if request.max_turnover is not None:
+        constraints["max_turnover"] = request.max_turnover
+        constraints["current_weights"] = request.current_weights
+    try:
+        moments = await job_runner.run_in_thread(lab.portfolio_moments, shrinkage=request.shrinkage)
+        frontier, timings = await job_runner.run_in_process(
+            run_frontier, lab.data, lab.period, lab.interval, moments=moments, n_points=request.n_points,
+            **constraints
+        )
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid constraints: {str(e)}")
+    lab.timings.update(timings)
+
+    return {
+        "status": "success",
+        "assets": list(lab.data.columns),
+        "covariance": request.shrinkage or "sample",
+        "returns": frontier["returns"],
+        "volatilities": frontier["volatilities"],
+        "sharpe_ratios": frontier["sharpe_ratios"],
+        "weights": frontier["weights"],
+        "max_sharpe": frontier["max_sharpe"],
+        "timings": record_timings(lab, started)
+    }
+
+@app.post("/api/risk")
+async def get_risk(request: RiskRequest):
+    if not all(0 < level < 1 for level in request.confidence):
+        raise HTTPException(status_code=422, detail="Confidence levels must be between 0 and 1")
+    key = ("risk", request.model_dump_json())
+    return respond(await submit_job(key, _risk, request))
+
+async def _risk(request: RiskRequest):
+    """Monte Carlo risk of the max-Sharpe portfolio, simulated on the process pool and cached per dataset."""
+    started = time.perf_counter()
+    lab = await fetch_lab(request)
+    risk_kwargs = request.model_dump(include={"method", "n_paths", "horizon", "garch", "dof", "block_size", "seed"})
+    risk_kwargs["confidence"] = tuple(request.confidence)
+    keys = {stage: stage_key(lab, stage, (), risk_kwargs if stage == "risk" else {})
+            for stage in ("risk", "portfolio")}
+    risk, portfolio = (result_cache.get(stage, key) for stage, key in keys.items())
+    if risk is None or portfolio is None:
+        try:
+            risk, portfolio, timings = await job_runner.run_in_process(
+                run_risk, lab.data, lab.period, lab.interval, **risk_kwargs
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Risk simulation failed: {str(e)}")
+        lab.timings.update(timings)
+        result_cache.put(keys["risk"], risk, bar_seconds=interval_seconds(lab.interval))
+        result_cache.put(keys["portfolio"], portfolio, bar_seconds=interval_seconds(lab.interval))
+    else:
+        lab.timings["risk"] = {"cached": True}
+
+    return {
+        "status": "success",
+        "assets": list(lab.data.columns),
+        "weights": portfolio["optimal_weights"],
+        "risk": risk,
+        "timings": record_timings(lab, started)
+    }
+
 @app.post("/api/historical-data")
-async def get_historical_data(request: HistoricalDataRequest):
+async def get_historical_data(request: HistoricalDataRequest, http_request: Request):
+    media_type = encoding.JSON_MEDIA_TYPE
+    if request.format == "columnar":
+        media_type = encoding.negotiate(http_request.headers.get("accept"))
+    key = ("historical-data", tuple(request.cryptos), request.timeframe, request.interval, request.format,
+           request.max_points, request.float32, media_type)
+    return respond(await submit_job(key, job_runner.run_in_thread, _historical_data, request, media_type))
+
+def _historical_data(request: HistoricalDataRequest, media_type=encoding.JSON_MEDIA_TYPE):
+    started = time.perf_counter()
     try:
-        lab = CryptoQuantLab()
+        lab = CryptoQuantLab(store=price_store, cache=result_cache)
         lab.cryptos = request.cryptos
-        price_data = lab.fetch_data(period=request.timeframe)
+        price_data = lab.fetch_data(period=request.timeframe, interval=request.interval)
 
-        chart_data = []
-        for date in price_data.index:
-            row = {"date": date.isoformat()}
-            for crypto in price_data.columns:
-                row[crypto.replace('-USD', '')] = float(price_data.loc[date, crypto])
-            chart_data.append(row)
+        timestamps, values, names = encoding.prepare_frame(
+            price_data, max_points=request.max_points, float32=request.float32
+        )
+        names = [crypto.replace('-USD', '') for crypto in names]
+        timings = record_timings(lab, started)
+
+        if media_type == encoding.ARROW_MEDIA_TYPE:
+            return Response(encoding.encode_arrow(timestamps, values, names), media_type=media_type)
+
+        metadata = {
+            "total_points": len(timestamps),
+            "source_points": len(price_data),
+            "date_range": {
+                "start": price_data.index[0].isoformat(),
+                "end": price_data.index[-1].isoformat()
+            }
+        }
+        if request.format == "columnar":
+            if media_type == encoding.MSGPACK_MEDIA_TYPE:
+                payload = encoding.columnar_payload(timestamps, values.astype(float), names)
+            else:
+                payload = encoding.columnar_payload(timestamps, values, names, float32=request.float32)
+            body = {"status": "success", "format": "columnar", "data": payload,
+                    "cryptos": names, "metadata": metadata, "timings": timings}
+            if media_type == encoding.MSGPACK_MEDIA_TYPE:
+                return Response(encoding.encode_msgpack(body, float32=request.float32), media_type=media_type)
+            return body
 
         return {
             "status": "success",
-            "data": chart_data,
-            "cryptos": [crypto.replace('-USD', '') for crypto in price_data.columns],
-            "metadata": {
-                "total_points": len(chart_data),
-                "date_range": {
-                    "start": price_data.index[0].isoformat(),
-                    "end": price_data.index[-1].isoformat()
-                }
-            }
+            "data": encoding.row_payload(timestamps, values, names),
+            "cryptos": names,
+            "metadata": metadata,
+            "timings": timings
         }
 
     except Exception as e:
@@ -280,21 +651,78 @@ async def get_historical_data(request: HistoricalDataRequest):
             detail=f"Couldn't get historical data: {str(e)}"
         )
 
+@app.websocket("/ws/arbitrage")
+async def arbitrage_monitor(websocket: WebSocket):
+    """Replay recorded bars through a live arbitrage monitor and push each signal change.
+
+    The client sends one JSON ``ArbitrageMonitorRequest``. The first
+    ``warmup_bars`` bars (default: half the history) warm the monitor up; the
+    rest are replayed, at ``speed`` times real time when given, and every
+    LONG/SHORT/FLAT change is sent as a JSON message. A final ``done`` event
+    carries the monitor's latency stats.
+    """
+    from arbitrage_monitor import ArbitrageMonitor, ReplayFeed
+
+    await websocket.accept()
+    try:
+        request = ArbitrageMonitorRequest(**await websocket.receive_json())
+        data = (await fetch_lab(request)).data
+        if data.shape[1] < 2:
+            raise ValueError(f"Need prices for at least two assets, got {', '.join(data.columns)}")
+        split = request.warmup_bars or len(data) // 2
+        monitor = ArbitrageMonitor(data.columns, request.pairs, method=request.method, z_entry=request.z_entry,
+                                   z_exit=request.z_exit, halflife=request.halflife)
+        await job_runner.run_in_thread(monitor.warm_up, data.iloc[:split])
+        await websocket.send_text(encoding.dumps({
+            "event": "ready", "pairs": len(monitor.pairs), "warmup_bars": min(split, len(data)),
+            "replay_bars": max(len(data) - split, 0), "signals": monitor.snapshot()
+        }).decode())
+
+        async def push(alert):
+            METRICS.inc("arbitrage_alerts_total", help="Arbitrage monitor signal changes pushed.",
+                        direction=alert["direction"])
+            await websocket.send_text(encoding.dumps({"event": "signal", **alert}).decode())
+
+        stats = await monitor.run(ReplayFeed(data.iloc[split:], speed=request.speed), push)
+        await websocket.send_text(encoding.dumps({"event": "done", **stats}).decode())
+        await websocket.close()
+    except WebSocketDisconnect:
+        return
+    except (HTTPException, ValidationError, KeyError, ValueError) as e:
+        await send_error(websocket, getattr(e, "detail", None) or str(e), code=1008)
+    except Exception as e:
+        await send_error(websocket, f"Arbitrage monitor failed: {str(e)}", code=1011)
+
+async def send_error(websocket: WebSocket, error, code):
+    """Send an ``error`` event, then close the socket with ``code``."""
+    try:
+        await websocket.send_text(encoding.dumps({"event": "error", "error": error}).decode())
+        await websocket.close(code=code)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return {
-        "status": "error",
-        "error": exc.detail,
-        "status_code": exc.status_code
-    }
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "status": "error",
+            "error": exc.detail,
+            "status_code": exc.status_code
+        },
+        headers=exc.headers
+    )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
-    return {
-        "status": "error",
-        "error": "Something went wrong on our end",
-        "detail": str(exc)
-    }
+    return JSONResponse(
+        status_code=500,
+        content={
+            "status": "error",
+            "error": "Something went wrong on our end",
+            "detail": str(exc)
+        }
+    )
 
 if __name__ == '__main__':
     uvicorn.run(
@@ -0,0 +1,110 @@
+"""Costed backtests of position matrices.
+
+``run_backtest`` takes the weights held over each bar, shaped
+(bars, assets) or (strategies, bars, assets) to run many books side by
+side, and charges fees and slippage on every unit of turnover. It walks the
+bars once in chunks through ``CostedBacktest``, which carries the previous
+positions, equity and running peak between chunks and writes into
+preallocated output arrays, so memory beyond the outputs is bounded by the
+chunk size however long the history is.
+"""
+import numpy as np
+
+
+class CostedBacktest:
+    """Accumulates a costed backtest over consecutive chunks of bars.
+
+    Output arrays for all ``n_bars`` are preallocated; each ``update`` fills
+    the next rows and carries positions, equity and the running peak forward,
+    so chunks can come from a stream that never fits in memory at once.
+    """
+
+    def __init__(self, n_strategies, n_bars, n_assets, fee_rate=0.001, slippage=0.0005,
+                 periods_per_year=365):
+        self.n_bars = n_bars
+        self.cost_rate = fee_rate + slippage
+        self.periods_per_year = periods_per_year
+        self.net = np.empty((n_strategies, n_bars))
+        self.equity = np.empty((n_strategies, n_bars))
+        self.drawdown = np.empty((n_strategies, n_bars))
+        self.turnover = np.empty((n_strategies, n_bars))
+        self.trades = np.zeros(n_strategies, dtype=np.int64)
+        self.entries = np.zeros(n_strategies, dtype=np.int64)
+        self.held_bars = np.zeros(n_strategies, dtype=np.int64)
+        self.previous = np.zeros((n_strategies, 1, n_assets))
+        self.wealth = np.ones((n_strategies, 1))
+        self.peak = np.ones((n_strategies, 1))
+        self.position = 0
+
+    def update(self, held, returns):
+        """Add bars: ``held`` is (strategies, bars, assets), ``returns`` (bars, assets)."""
+        start, stop = self.position, self.position + held.shape[1]
+        held = held.astype(float)
+        change = np.diff(held, axis=1, prepend=self.previous)
+        moved = change != 0
+        invested = held != 0
+
+        turnover = self.turnover[:, start:stop]
+        turnover[:] = np.abs(change).sum(axis=2)
+        net = self.net[:, start:stop]
+        net[:] = np.einsum('sbn,bn->sb', held, np.asarray(returns, dtype=float)) - self.cost_rate * turnover
+        equity = self.equity[:, start:stop]
+        equity[:] = self.wealth * np.cumprod(1 + net, axis=1)
+        running_peak = np.maximum(np.maximum.accumulate(equity, axis=1), self.peak)
+        self.drawdown[:, start:stop] = equity / running_peak - 1
+
+        self.trades += moved.sum(axis=(1, 2))
+        self.entries += (moved & invested).sum(axis=(1, 2))
+        self.held_bars += invested.sum(axis=(1, 2))
+        self.previous = held[:, -1:]
+        self.wealth = equity[:, -1:]
+        self.peak = running_peak[:, -1:]
+        self.position = stop
+
+    def result(self):
+        net = self.net[:, :self.position]
+        turnover = self.turnover[:, :self.position]
+        drawdown = self.drawdown[:, :self.position]
+        total_return = self.wealth[:, 0] - 1
+        annualized_return = (1 + total_return) ** (self.periods_per_year / self.position) - 1
+        volatility = net.std(axis=1, ddof=1) * np.sqrt(self.periods_per_year)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe_ratio = annualized_return / volatility
+            holding_period = self.held_bars / self.entries
+
+        return {
+            'net_returns': net,
+            'equity': self.equity[:, :self.position],
+            'drawdown': drawdown,
+            'turnover': turnover,
+            'total_return': total_return,
+            'annualized_return': annualized_return,
+            'volatility': volatility,
+            'sharpe_ratio': sharpe_ratio,
+            'max_drawdown': drawdown.min(axis=1),
+            'total_trades': self.trades,
+            'average_holding_period': holding_period,
+            'annual_turnover': turnover.mean(axis=1) * self.periods_per_year,
+            'total_costs': self.cost_rate * turnover.sum(axis=1),
+            'win_rate': (net > 0).mean(axis=1),
+        }
+
+
+def run_backtest(positions, returns, fee_rate=0.001, slippage=0.0005, periods_per_year=365,
+                 chunk_size=65536):
+    """Net returns, equity, drawdown and trade statistics per strategy.
+
+    ``positions[..., t, :]`` is held over bar ``t`` and earns ``returns[t]``;
+    moving from the previous bar's positions costs
+    ``(fee_rate + slippage) * sum(|change|)``. Arrays in the result carry a
+    leading strategy axis; statistics are one value per strategy.
+    """
+    positions = np.asarray(positions)
+    if positions.ndim == 2:
+        positions = positions[np.newaxis]
+    n_strategies, n_bars, n_assets = positions.shape
+
+    backtest = CostedBacktest(n_strategies, n_bars, n_assets, fee_rate, slippage, periods_per_year)
+    for start in range(0, n_bars, chunk_size):
+        backtest.update(positions[:, start:start + chunk_size], returns[start:start + chunk_size])
+    return backtest.result()
@@ -0,0 +1,34 @@
+"""Bar intervals and the annualization factors derived from them.
+
+Crypto trades around the clock every day, so a year is 365 days of bars:
+365 daily bars, 8,760 hourly bars, 525,600 minute bars.
+"""
+INTERVAL_SECONDS = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800,
+    '60m': 3600, '90m': 5400, '1h': 3600,
+    '1d': 86400, '5d': 5 * 86400, '1wk': 7 * 86400,
+}
+SECONDS_PER_YEAR = 365 * 86400
+
+
+def interval_seconds(interval):
+    try:
+        return INTERVAL_SECONDS[interval]
+    except KeyError:
+        raise ValueError(f"Unsupported interval: {interval}") from None
+
+
+def infer_interval_seconds(index):
+    """Typical bar spacing of a DatetimeIndex, in seconds."""
+    import numpy as np
+
+    if len(index) < 2:
+        return INTERVAL_SECONDS['1d']
+    spacing = np.diff(index.values.astype('datetime64[s]').astype(np.int64))
+    return float(np.median(spacing))
+
+
+def periods_per_year(interval=None, index=None):
+    """Bars per year for ``interval``, or inferred from ``index`` when no interval is given."""
+    seconds = interval_seconds(interval) if interval is not None else infer_interval_seconds(index)
+    return SECONDS_PER_YEAR / seconds
@@ -0,0 +1,189 @@
+"""Run the analysis pipeline over many (universe, timeframe) jobs at once.
+
+Prices for the union of all tickers are fetched once per bar interval, over
+the longest timeframe asked for, and aligned (outer join) into one float64
+``.npy`` matrix per interval in a scratch directory (``/dev/shm`` when
+available). Worker processes memory-map those matrices, so the prices are
+shared rather than pickled to each job. A job whose tickers sit in adjacent
+columns with no gaps in its window uses that window of the matrix as-is
+(``common`` alignment, float64); any other job copies only its own columns. Identical jobs run once, the largest run
+first, and each job's headline numbers become one row of a columnar file.
+"""
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from alignment import align_prices
+from crypto_quantlab import STAGES, run_stages, with_prerequisites
+from price_store import YFinanceSource, period_start_ns
+
+# Scalar results copied into the output, per stage.
+SUMMARY_FIELDS = {
+    'cointegration': ('is_cointegrated', 'johansen_trace_statistic', 'cointegration_probability',
+                      'mcmc_simulations', 'pairs_tested'),
+    'strategies': ('momentum_sharpe', 'mean_reversion_sharpe', 'combined_sharpe'),
+    'portfolio': ('expected_return', 'volatility', 'sharpe_ratio'),
+    'backtest': ('total_return', 'annualized_return', 'volatility', 'sharpe_ratio', 'max_drawdown',
+                 'total_trades', 'win_rate', 'total_costs', 'annual_turnover'),
+    'arbitrage': ('total_pairs_analyzed', 'active_opportunities', 'total_opportunity_value'),
+}
+
+# Per-worker: interval -> (prices memmap, timestamps in ns, column position by ticker).
+_MATRICES = {}
+
+
+def _parse_job(job):
+    if isinstance(job, dict):
+        return tuple(job['cryptos']), job.get('timeframe', '1y'), job.get('interval', '1d')
+    universe, timeframe, *interval = job
+    return tuple(universe), timeframe, interval[0] if interval else '1d'
+
+
+def fetch_union(tickers, period, interval='1d', store=None):
+    """Close prices for ``tickers`` on the union of their timestamps (no rows dropped)."""
+    if store is not None:
+        frame = store.load(tickers, period=period, interval=interval, strict=False)
+    else:
+        start_ns = period_start_ns(period, interval)
+        frame = YFinanceSource().fetch(tickers, start=None if start_ns is None else pd.Timestamp(start_ns),
+                                       interval=interval)
+    return frame.reindex(columns=[t for t in tickers if t in frame.columns]).sort_index()
+
+
+def _earliest(periods, interval):
+    starts = {period: period_start_ns(period, interval) for period in periods}
+    if any(start is None for start in starts.values()):
+        return 'max'
+    return min(starts, key=starts.get)
+
+
+def _init_worker(matrices):
+    for interval, (values_path, index_path, columns) in matrices.items():
+        _MATRICES[interval] = (np.load(values_path, mmap_mode='r'), np.load(index_path),
+                               {ticker: i for i, ticker in enumerate(columns)})
+
+
+def _job_frame(universe, timeframe, interval, alignment='common', float32=False):
+    values, index, positions = _MATRICES[interval]
+    start_ns = period_start_ns(timeframe, interval)
+    lo = 0 if start_ns is None else int(np.searchsorted(index, start_ns))
+    missing = [t for t in universe if t not in positions]
+    if missing:
+        raise ValueError(f"No data for {', '.join(missing)}")
+    cols = [positions[t] for t in universe]
+    contiguous = cols == list(range(cols[0], cols[0] + len(cols)))
+    block = values[lo:, cols[0]:cols[0] + len(cols)] if contiguous else values[lo:, cols]
+    frame = pd.DataFrame(block, index=pd.DatetimeIndex(index[lo:].astype('datetime64[ns]')),
+                         columns=list(universe), copy=False)
+    if contiguous and alignment == 'common' and not float32 and not np.isnan(block).any():
+        # Already aligned: a read-only view of the shared matrix, nothing copied.
+        return frame
+    return align_prices(frame, alignment, float32=float32)
+
+
+def _run_job(universe, timeframe, interval, stages, stage_kwargs, alignment='common', float32=False):
+    """One output row: job description, headline results and stage timings."""
+    row = {'universe': ','.join(universe), 'timeframe': timeframe, 'interval': interval}
+    started = time.perf_counter()
+    try:
+        data = _job_frame(universe, timeframe, interval, alignment, float32)
+        row.update(observations=len(data), start=data.index[0] if len(data) else None,
+                   end=data.index[-1] if len(data) else None)
+        results, timings, _ = run_stages(data, timeframe, stages, stage_kwargs, interval=interval)
+    except Exception as e:
+        row.update(status='failed', error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - started)
+        return row
+
+    for stage in stages:
+        result = results.get(stage)
+        for field in SUMMARY_FIELDS.get(stage, ()):
+            value = result.get(field) if result else None
+            row[f"{stage}_{field}"] = value.item() if isinstance(value, np.generic) else value
+        row[f"{stage}_seconds"] = timings.get(stage, {}).get('wall_seconds')
+    if results.get('cointegration'):
+        row['cointegration_pairs_found'] = len(results['cointegration']['arbitrage_opportunities'])
+    if results.get('portfolio'):
+        row['portfolio_weights'] = json.dumps({t: float(w) for t, w in results['portfolio']['optimal_weights'].items()})
+    failed = [stage for stage in stages if stage not in results]
+    row.update(status='partial' if failed else 'success', error=', '.join(failed) or None,
+               seconds=time.perf_counter() - started)
+    return row
+
+
+def write_columnar(frame, path):
+    """Write ``frame`` as Parquet, Feather or CSV, by file extension."""
+    path = str(path)
+    if path.endswith('.parquet'):
+        frame.to_parquet(path, index=False)
+    elif path.endswith(('.feather', '.arrow')):
+        frame.to_feather(path)
+    elif path.endswith('.csv'):
+        frame.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format: {path} (use .parquet, .feather or .csv)")
+
+
+def run_batch(jobs, output=None, stages=tuple(STAGES), stage_kwargs=None, store=None, n_jobs=1, workdir=None,
+              alignment='common', float32=False):
+    """Run ``stages`` for every job and return (and optionally write) one row per job.
+
+    ``jobs`` are ``(universe, timeframe[, interval])`` tuples or dicts with
+    ``cryptos``, ``timeframe`` and ``interval`` keys. Prices come from
+    ``store`` (a ``PriceStore``) when given, otherwise straight from Yahoo
+    Finance. ``alignment`` and ``float32`` are applied to each job's frame as
+    in ``alignment.align_prices``.
+    """
+    started = time.perf_counter()
+    jobs = [_parse_job(job) for job in jobs]
+    stages = tuple(with_prerequisites(stages))
+    unique = list(dict.fromkeys(jobs))
+
+    by_interval = {}
+    for universe, timeframe, interval in unique:
+        tickers, periods = by_interval.setdefault(interval, ({}, set()))
+        tickers.update(dict.fromkeys(universe))
+        periods.add(timeframe)
+
+    if workdir is None and os.path.isdir('/dev/shm'):
+        workdir = '/dev/shm'
+    with tempfile.TemporaryDirectory(prefix='crypto_quantlab_batch_', dir=workdir) as scratch:
+        matrices, rows_by_interval = {}, {}
+        for interval, (tickers, periods) in by_interval.items():
+            frame = fetch_union(list(tickers), _earliest(periods, interval), interval, store)
+            values_path = os.path.join(scratch, f"{interval}.values.npy")
+            index_path = os.path.join(scratch, f"{interval}.index.npy")
+            np.save(values_path, frame.to_numpy(dtype=float))
+            np.save(index_path, frame.index.values.astype('datetime64[ns]').astype(np.int64))
+            matrices[interval] = (values_path, index_path, list(frame.columns))
+            rows_by_interval[interval] = len(frame)
+        fetched = time.perf_counter()
+
+        # Largest first, so a long job does not start last and hold up the batch.
+        order = sorted(unique, key=lambda job: rows_by_interval[job[2]] * len(job[0]) ** 2, reverse=True)
+        rows = {}
+        if n_jobs == 1 or len(order) <= 1:
+            _init_worker(matrices)
+            for job in order:
+                rows[job] = _run_job(*job, stages, stage_kwargs, alignment, float32)
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(matrices,)) as pool:
+                futures = {pool.submit(_run_job, *job, stages, stage_kwargs, alignment, float32): job for job in order}
+                for future in as_completed(futures):
+                    rows[futures[future]] = future.result()
+        _MATRICES.clear()
+
+    table = pd.DataFrame([{'job': i, **rows[job]} for i, job in enumerate(jobs)])
+    if output is not None:
+        write_columnar(table, output)
+
+    n_tickers = sum(len(tickers) for tickers, _ in by_interval.values())
+    failed = int((table['status'] == 'failed').sum())
+    print(f"Batch: {len(jobs)} jobs ({len(unique)} unique) over {n_tickers} price series in "
+          f"{time.perf_counter() - started:.1f}s (fetch {fetched - started:.1f}s), {failed} failed"
+          + (f" → {output}" if output is not None else ""))
+    return table
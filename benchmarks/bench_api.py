@@ -0,0 +1,138 @@
+"""Load test of the FastAPI endpoints against a synthetic, local price store.
+
+Run with ``python benchmarks/bench_api.py`` (progress goes to stderr, the
+analysis summaries workers print to stdout). Requests go through the ASGI app
+in-process via ``httpx``, so nothing listens on a port, and prices come from
+``SyntheticSource`` instead of Yahoo Finance. Each scenario is driven at
+several concurrency levels; latency percentiles, throughput and status
+counts are written to JSON for ``compare.py``.
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from bench_pipeline import ROOT, environment
+from synthetic import SyntheticSource, tickers
+
+CONCURRENCY = (1, 8, 32)
+UNIVERSE = tickers(20)
+
+
+def scenarios(n_requests):
+    """name -> (method, path, payload for request i, request count)."""
+    pairs = list(itertools.combinations(UNIVERSE[:5], 2))
+    return {
+        'health': ('GET', '/api/health', lambda i: None, n_requests),
+        'quick_analysis': ('POST', '/api/quick-analysis',
+                           lambda i: {'cryptos': list(pairs[i % len(pairs)]), 'timeframe': '3mo'}, n_requests),
+        'historical_rows': ('POST', '/api/historical-data',
+                            lambda i: {'cryptos': UNIVERSE[:10], 'timeframe': '1y'}, n_requests),
+        'historical_columnar': ('POST', '/api/historical-data',
+                                lambda i: {'cryptos': UNIVERSE[:10], 'timeframe': '5y', 'format': 'columnar'},
+                                n_requests),
+        'frontier': ('POST', '/api/frontier',
+                     lambda i: {'cryptos': UNIVERSE[:10], 'timeframe': '1y', 'n_points': 50 + i % 10},
+                     max(1, n_requests // 5)),
+        # Distinct simulation counts defeat the result cache and request coalescing.
+        'analyze_cold': ('POST', '/api/analyze',
+                         lambda i: {'cryptos': UNIVERSE[:5], 'timeframe': '1y', 'max_simulations': 1000 + i},
+                         max(1, n_requests // 5)),
+        'analyze_warm': ('POST', '/api/analyze',
+                         lambda i: {'cryptos': UNIVERSE[:5], 'timeframe': '1y', 'max_simulations': 1000},
+                         n_requests),
+    }
+
+
+async def drive(client, method, path, payload, n_requests, concurrency):
+    """Issue ``n_requests`` from ``concurrency`` concurrent clients; latency and status stats."""
+    latencies, statuses = [], collections.Counter()
+    requests = iter(range(n_requests))
+
+    async def worker():
+        for i in requests:
+            body = payload(i)
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies = np.array(latencies) * 1e3
+    return {
+        'requests': n_requests,
+        'errors': sum(n for status, n in statuses.items() if status >= 400),
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'seconds': elapsed,
+        'throughput_rps': n_requests / elapsed,
+        'latency_mean_ms': float(latencies.mean()),
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p90_ms': float(np.percentile(latencies, 90)),
+        'latency_p99_ms': float(np.percentile(latencies, 99)),
+        'latency_max_ms': float(latencies.max()),
+    }
+
+
+async def run(args, api_server):
+    transport = httpx.ASGITransport(app=api_server.app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=600) as client:
+        for name, (method, path, payload, n_requests) in scenarios(args.requests).items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            # One untimed request fills the price store (and, when warm, the cache).
+            await client.request(method, path, json=payload(0))
+            for concurrency in args.concurrency:
+                if name == 'analyze_cold':
+                    api_server.result_cache.clear()
+                record = {'suite': 'api', 'scenario': name, 'method': method, 'path': path,
+                          'concurrency': concurrency,
+                          **await drive(client, method, path, payload, n_requests, concurrency)}
+                results.append(record)
+                print(f"{name:20s} x{concurrency:<3d} {record['throughput_rps']:8.1f} req/s  "
+                      f"p50 {record['latency_p50_ms']:8.1f} ms  p99 {record['latency_p99_ms']:8.1f} ms  "
+                      f"statuses {record['statuses']}", file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50, help='requests per scenario and concurrency level')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=list(CONCURRENCY))
+    parser.add_argument('--scenarios', nargs='+', help='only these scenarios')
+    parser.add_argument('--output', help='JSON path (default benchmarks/results/api-<commit>.json)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['CRYPTO_QUANTLAB_DATA'] = tmp
+        os.environ.pop('CRYPTO_QUANTLAB_CSV_DIR', None)
+        import api_server
+        from price_store import PriceStore
+
+        api_server.price_store = PriceStore(root=tmp, source=SyntheticSource(UNIVERSE))
+        try:
+            results = asyncio.run(run(args, api_server))
+        finally:
+            api_server.job_runner.shutdown()
+
+    meta = environment()
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"api-{(meta['commit'] or 'unknown')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'environment': meta, 'args': vars(args), 'results': results}, f, indent=1)
+    print(f"Wrote {len(results)} scenarios to {output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
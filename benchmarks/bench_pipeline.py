@@ -0,0 +1,189 @@
+"""Wall time and peak memory of each CryptoQuantLab method on synthetic data.
+
+Run with ``python benchmarks/bench_pipeline.py``; ``--quick`` runs a small
+grid. Each case runs the pipeline in order on one lab (no result cache),
+timing every method ``--repeats`` times and then once more under
+``tracemalloc`` for its peak allocation. Cases cover asset counts, daily
+histories from 3mo to 5y, minute bars and bootstrap sizes, on both
+cointegrated and random-walk prices. Results go to a JSON file that
+``compare.py`` diffs between commits.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from synthetic import GENERATORS, HISTORY_DAYS, SyntheticSource, history_bars
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crypto_quantlab import CryptoQuantLab  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS = (5, 20, 100)
+HISTORIES = tuple(HISTORY_DAYS)
+MINUTE_DAYS = 7
+BOOTSTRAP_SIZES = (1000, 10000, 50000)
+PIPELINE_SIMULATIONS = 1000
+
+
+def pipeline(lab, npy_path, n_simulations=PIPELINE_SIMULATIONS):
+    """(method, kwargs) in run order; later methods read earlier results."""
+    window = min(int(lab.periods_per_year), len(lab.data) // 2)
+    return [
+        ('cointegration_analysis', {'n_simulations': n_simulations, 'seed': 0}),
+        ('systematic_strategies', {}),
+        ('parameter_sweep', {}),
+        ('portfolio_optimization', {}),
+        ('risk_analysis', {'n_paths': 20_000, 'horizon': 365, 'seed': 0}),
+        ('frontier_analysis', {'n_points': 50}),
+        ('walk_forward_optimization', {'window': window}),
+        ('comprehensive_backtest', {}),
+        ('quantify_cointegration_arbitrage', {}),
+        ('out_of_core_backtest', {'source': npy_path}),
+    ]
+
+
+def measure(fn, repeats):
+    """Wall-clock seconds of each call, then the traced peak of one more."""
+    seconds = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds_min': min(seconds),
+        'seconds_median': statistics.median(seconds),
+        'repeats': repeats,
+        'peak_memory_bytes': peak,
+    }
+
+
+def run_case(kind, n_assets, history, interval, repeats, methods=None, n_simulations=PIPELINE_SIMULATIONS):
+    n_bars = history_bars(history, interval)
+    case = {'kind': kind, 'assets': n_assets, 'history': history, 'interval': interval, 'bars': n_bars}
+    data = GENERATORS[kind](n_assets, n_bars, interval, seed=n_assets)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        npy_path = os.path.join(tmp, 'prices.npy')
+        np.save(npy_path, data.values.astype(np.float32))
+
+        lab = CryptoQuantLab(store=PriceStore(root=tmp, source=SyntheticSource(list(data.columns), kind=kind)),
+                             interval=interval)
+        lab.cryptos = list(data.columns)
+        if methods is None or 'fetch_data' in methods:
+            period = f"{history}d" if interval != '1d' else history
+            results.append({**case, 'method': 'fetch_data', 'params': {'period': period},
+                            **measure(lambda: lab.fetch_data(period=period), repeats)})
+        lab.data = data
+
+        for method, kwargs in pipeline(lab, npy_path, n_simulations):
+            if methods is not None and method not in methods:
+                continue
+            record = {**case, 'method': method, 'params': {k: v for k, v in kwargs.items() if k != 'source'}}
+            try:
+                record.update(measure(lambda: getattr(lab, method)(**kwargs), repeats))
+            except Exception as e:
+                record['error'] = f"{type(e).__name__}: {e}"
+            results.append(record)
+    return results
+
+
+def cases(args):
+    for kind in args.kinds:
+        for n_assets in args.assets:
+            for history in args.histories:
+                yield kind, n_assets, history, '1d'
+            if args.minute_days:
+                yield kind, n_assets, args.minute_days, '1m'
+
+
+def environment():
+    def git(*command):
+        try:
+            return subprocess.run(['git', *command], cwd=ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='5 and 20 assets, 3mo and 1y, one repeat')
+    parser.add_argument('--kinds', nargs='+', default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument('--assets', nargs='+', type=int, default=list(ASSETS))
+    parser.add_argument('--histories', nargs='+', default=list(HISTORIES), choices=list(HISTORIES))
+    parser.add_argument('--minute-days', type=int, default=MINUTE_DAYS, help='days of minute bars (0 skips them)')
+    parser.add_argument('--bootstrap-sizes', nargs='+', type=int, default=list(BOOTSTRAP_SIZES))
+    parser.add_argument('--methods', nargs='+', help='only these CryptoQuantLab methods')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='JSON path (default benchmarks/results/pipeline-<commit>.json)')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.assets, args.histories, args.repeats = [5, 20], ['3mo', '1y'], 1
+        args.bootstrap_sizes = args.bootstrap_sizes[:2]
+
+    meta = environment()
+    results = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for kind, n_assets, history, interval in cases(args):
+            for record in run_case(kind, n_assets, history, interval, args.repeats, args.methods):
+                results.append({'suite': 'pipeline', **record})
+                print(format_record(record), file=sys.stderr)
+
+        if args.methods is None or 'cointegration_analysis' in args.methods:
+            for n_simulations in args.bootstrap_sizes:
+                for record in run_case('cointegrated', 5, '1y', '1d', args.repeats, ['cointegration_analysis'],
+                                       n_simulations):
+                    results.append({'suite': 'bootstrap', **record})
+                    print(format_record(record), file=sys.stderr)
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"pipeline-{(meta['commit'] or 'unknown')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'environment': meta, 'args': vars(args), 'results': results}, f, indent=1)
+    print(f"Wrote {len(results)} timings to {output}")
+
+
+def format_record(record):
+    label = f"{record['kind']:12s} {record['assets']:4d} assets {str(record['history']):>4s} {record['interval']:2s}"
+    if 'error' in record:
+        return f"{label} {record['method']:32s} failed: {record['error']}"
+    return (f"{label} {record['method']:32s} {record['seconds_min'] * 1e3:10.1f} ms "
+            f"{record['peak_memory_bytes'] / 2 ** 20:9.1f} MiB  {record['params'] or ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Per-response serialization cost: recursive clean_results vs encoding.dumps.
+
+Run with ``python benchmarks/bench_serialization.py``. The "before" path is
+the original ``clean_results`` walk followed by FastAPI's ``jsonable_encoder``
+and Starlette's ``JSONResponse`` rendering.
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import encoding  # noqa: E402
+
+
+def serialize_numpy(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    return obj
+
+
+def clean_results(data):
+    if isinstance(data, dict):
+        return {k: clean_results(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [clean_results(item) for item in data]
+    else:
+        return serialize_numpy(data)
+
+
+def before(payload):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    return JSONResponse(jsonable_encoder(clean_results(payload))).body
+
+
+def sample_payloads(n_assets=20, n_obs=1825, seed=0):
+    rng = np.random.default_rng(seed)
+    tickers = [f"C{i}-USD" for i in range(n_assets)]
+    returns = pd.DataFrame(rng.normal(0, 0.03, (n_obs, n_assets)), columns=tickers)
+    analysis = {
+        "status": "success",
+        "cointegration": {"cointegration_probability": np.float64(0.97),
+                          "mcmc_simulations": np.int64(10000),
+                          "probability_interval": [0.96, 0.98]},
+        "strategies": {name: np.float64(rng.normal()) for name in
+                       ("momentum_sharpe", "mean_reversion_sharpe", "combined_sharpe")},
+        "portfolio": {"optimal_weights": dict(zip(tickers, rng.dirichlet(np.ones(n_assets))))},
+        "equity_curve": np.cumprod(1 + rng.normal(0, 0.01, n_obs)),
+    }
+    correlation = {"correlation_matrix": returns.corr().to_dict()}
+    return {"analysis": analysis, "correlation": correlation}
+
+
+def main(number=200):
+    for name, payload in sample_payloads().items():
+        t_before = timeit.timeit(lambda: before(payload), number=number) / number
+        t_after = timeit.timeit(lambda: encoding.dumps(payload), number=number) / number
+        print(f"{name:12s} before {t_before * 1e6:9.1f} us | after {t_after * 1e6:8.1f} us "
+              f"| {t_before / t_after:5.1f}x ({'orjson' if encoding.orjson else 'stdlib'})")
+
+    nan_payload = {"sharpe_ratio": np.float64("nan"), "volatility": float("inf")}
+    try:
+        before(nan_payload)
+        print("before: NaN payload rendered")
+    except ValueError as e:
+        print(f"before: NaN payload fails ({e})")
+    print(f"after:  {encoding.dumps(nan_payload).decode()}")
+
+
+if __name__ == "__main__":
+    main()
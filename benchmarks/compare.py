@@ -0,0 +1,78 @@
+"""Compare two benchmark JSON files, e.g. from two commits.
+
+Run with ``python benchmarks/compare.py baseline.json candidate.json``.
+Cases are matched on suite, method and data shape (pipeline results) or
+endpoint and scenario (API results). Exits non-zero when any matched case is
+slower, or uses more memory, than ``--threshold`` times the baseline.
+"""
+import argparse
+import json
+import sys
+
+# Fields naming a case and the metric compared for each kind of result.
+CASE_FIELDS = ('suite', 'method', 'kind', 'assets', 'history', 'interval', 'params', 'scenario', 'concurrency')
+METRICS = {
+    'seconds_min': 'time',
+    'peak_memory_bytes': 'memory',
+    'latency_p50_ms': 'p50',
+    'latency_p99_ms': 'p99',
+}
+
+
+def case_key(record):
+    return json.dumps({field: record.get(field) for field in CASE_FIELDS}, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report['environment'], {case_key(r): r for r in report['results'] if 'error' not in r}
+
+
+def describe(record):
+    if record.get('suite') == 'api':
+        return f"{record['scenario']} x{record['concurrency']}"
+    return (f"{record['kind']} {record['assets']} assets {record['history']} {record['interval']} "
+            f"{record['method']}{' ' + json.dumps(record['params']) if record.get('params') else ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=1.25, help='ratio flagged as a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.005,
+                        help='ignore timing changes when both runs are faster than this')
+    args = parser.parse_args(argv)
+
+    base_env, baseline = load(args.baseline)
+    cand_env, candidate = load(args.candidate)
+    print(f"baseline  {base_env.get('commit')} ({base_env.get('timestamp')})")
+    print(f"candidate {cand_env.get('commit')} ({cand_env.get('timestamp')})")
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        changes = []
+        for metric, label in METRICS.items():
+            if metric not in old or metric not in new or not old[metric]:
+                continue
+            if metric == 'seconds_min' and max(old[metric], new[metric]) < args.min_seconds:
+                continue
+            if metric == 'peak_memory_bytes' and max(old[metric], new[metric]) < 2 ** 20:
+                continue
+            ratio = new[metric] / old[metric]
+            flag = ratio > args.threshold
+            regressions += flag
+            if flag or ratio < 1 / args.threshold:
+                changes.append(f"{label} {ratio:5.2f}x{' REGRESSION' if flag else ''}")
+        if changes:
+            print(f"{describe(new):70s} {' | '.join(changes)}")
+
+    only = len(baseline.keys() ^ candidate.keys())
+    print(f"{len(baseline.keys() & candidate.keys())} cases compared, {only} unmatched, {regressions} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,59 +1,118 @@
-import numpy as np
-import pandas as pd
-import yfinance as yf
-from scipy import stats
-from scipy.optimize import minimize
-from sklearn.preprocessing import StandardScaler
-from statsmodels.tsa.vector_ar.vecm import coint_johansen
-from statsmodels.tsa.stattools import coint
-import matplotlib.pyplot as plt
-import warnings
+"""Crypto QuantLab: cointegration, systematic strategies, portfolio optimization and backtests.
+
+Importing this module only loads the standard library; NumPy, pandas, SciPy,
+statsmodels and yfinance are imported by the stages that use them, so the CLI,
+API workers and batch jobs start fast and only pay for the stages they run.
+"""
+import argparse
+import contextlib
+import json
+import os
+import time
+from bars import periods_per_year
+from result_cache import cached_stage, frame_version
+from instrumentation import SamplingProfiler, timed_stage
+
+# Stages that read another stage's results from ``lab.results``.
+STAGE_REQUIRES = {
+    'backtest': ('strategies',),
+    'arbitrage': ('cointegration',),
+}
+
 
 class CryptoQuantLab:
-    def __init__(self):
+    def __init__(self, store=None, cache=None, interval='1d', alignment='common', float32=False):
         self.cryptos = ['BTC-USD', 'ETH-USD', 'ADA-USD', 'SOL-USD', 'LINK-USD']
+        self.store = store
+        self.cache = cache
+        self.progress = None
+        self.period = None
+        self.interval = interval
+        self.alignment = alignment
+        self.float32 = float32
         self.data = None
         self.results = {}
-
-    def fetch_data(self, period='1y'):
-        data = yf.download(self.cryptos, period=period)["Close"]
-        self.data = data.dropna()
+        self.result_keys = {}
+        self.timings = {}
+        self._versioned = (None, None)
+        self._derived = (None, {})
+
+    @property
+    def data_version(self):
+        if self._versioned[0] is not self.data:
+            self._versioned = (self.data, frame_version(self.data))
+        return self._versioned[1]
+
+    def _shared(self, name, compute):
+        """``compute(self.data)``, computed once per frame and shared by the stages."""
+        if self._derived[0] is not self.data:
+            self._derived = (self.data, {})
+        derived = self._derived[1]
+        if name not in derived:
+            derived[name] = compute(self.data)
+        return derived[name]
+
+    @property
+    def returns(self):
+        """Bar returns of ``data``; NaN where an asset has no price (``alignment='pairwise'``)."""
+        from alignment import bar_returns
+
+        return self._shared('returns', bar_returns)
+
+    @property
+    def log_prices(self):
+        import numpy as np
+
+        return self._shared('log_prices', np.log)
+
+    @property
+    def periods_per_year(self):
+        """Annualization factor for the bar interval (inferred from the index if unset)."""
+        if self.interval is None:
+            return periods_per_year(index=self.data.index)
+        return periods_per_year(self.interval)
+
+    @timed_stage('fetch')
+    def fetch_data(self, period='1y', interval=None):
+        from alignment import align_prices
+
+        interval = interval or self.interval
+        if self.store is not None:
+            data = self.store.load(self.cryptos, period=period, interval=interval)
+        else:
+            import yfinance as yf
+
+            data = yf.download(self.cryptos, period=period, interval=interval)["Close"]
+        self.period = period
+        self.interval = interval
+        self.data = align_prices(data, self.alignment, float32=self.float32)
         return self.data
 
-    def cointegration_analysis(self):
+    @cached_stage('cointegration')
+    @timed_stage('cointegration', counts=lambda r: {'replicates': r['mcmc_simulations'], 'pairs': r['pairs_tested']})
+    def cointegration_analysis(self, n_simulations=10000, n_jobs=1, seed=None, ci_half_width=None,
+                               min_pair_correlation=None, pair_correction='fdr_bh'):
         """Johansen cointegration testing with bootstrap robustness"""
-        log_prices = np.log(self.data.iloc[:, :3])
-
-        # Johansen cointegration test
-        johansen_result = coint_johansen(log_prices, det_order=0, k_ar_diff=1)
-        trace_stat = johansen_result.lr1[0]
-        critical_value_95 = johansen_result.cvt[0, 1]
-        is_cointegrated = trace_stat > critical_value_95
-
-        n_simulations = 10000
-        cointegration_scores = []
-
-        for i in range(n_simulations):
-            sample_idx = np.random.choice(len(log_prices), size=len(log_prices), replace=True)
-            sample_data = log_prices.iloc[sample_idx]
-
-            try:
-                boot_result = coint_johansen(sample_data, det_order=0, k_ar_diff=1)
-                boot_trace = boot_result.lr1[0]
-                boot_critical = boot_result.cvt[0, 1]
-                cointegration_scores.append(1 if boot_trace > boot_critical else 0)
-            except:
-                cointegration_scores.append(0)
-
-        cointegration_prob = np.mean(cointegration_scores)
-
-        arbitrage_pairs = []
-        for i in range(len(log_prices.columns)):
-            for j in range(i+1, len(log_prices.columns)):
-                score, pvalue, _ = coint(log_prices.iloc[:, i], log_prices.iloc[:, j])
-                if pvalue < 0.05:
-                    pair = (log_prices.columns[i], log_prices.columns[j])
-                    arbitrage_pairs.append(pair)
+        from johansen_bootstrap import bootstrap_johansen
+        from pair_screen import screen_pairs
+
+        log_prices = self.log_prices
+
+        # Johansen trace test plus batched bootstrap of the same statistic
+        bootstrap = bootstrap_johansen(log_prices.iloc[:, :3].dropna().to_numpy(dtype=float),
+                                       n_simulations=n_simulations, det_order=0, k_ar_diff=1, n_jobs=n_jobs,
+                                       seed=seed, ci_half_width=ci_half_width, progress=self.progress)
+        trace_stat = bootstrap['trace_statistic']
+        critical_value_95 = bootstrap['critical_value_95']
+        is_cointegrated = bootstrap['is_cointegrated']
+        cointegration_prob = bootstrap['cointegration_probability']
+        n_simulations = bootstrap['n_simulations']
+
+        # Engle-Granger screen over every pair, FDR-adjusted across the universe
+        pairs = screen_pairs(log_prices, min_correlation=min_pair_correlation,
+                             correction=pair_correction, n_jobs=n_jobs)
+        significant = pairs[pairs['significant']]
+        arbitrage_pairs = list(zip(significant['asset1'], significant['asset2']))
 
         self.results['cointegration'] = {
             'is_cointegrated': is_cointegrated,
@@ -61,35 +120,48 @@ class CryptoQuantLab:
             'johansen_critical_value_95': float(critical_value_95),
             'cointegration_probability': float(cointegration_prob),
             'mcmc_simulations': n_simulations,
+            'bootstrap_failures': bootstrap['n_failed'],
+            'probability_interval': list(bootstrap['probability_interval']),
+            'pairs_tested': len(pairs),
             'arbitrage_opportunities': arbitrage_pairs
         }
 
         print(f"Cointegration test: {trace_stat:.2f} vs {critical_value_95:.2f} critical → {'✓ cointegrated' if is_cointegrated else '✗ not cointegrated'}")
-        print(f"Bootstrap probability from {n_simulations:,} simulations: {cointegration_prob:.3f}")
-        print(f"Found {len(arbitrage_pairs)} cointegrated pairs")
+        print(f"Bootstrap probability from {n_simulations:,} simulations: {cointegration_prob:.3f} "
+              f"[{bootstrap['probability_interval'][0]:.3f}, {bootstrap['probability_interval'][1]:.3f}] ({bootstrap['n_failed']:,} failed)")
+        print(f"Found {len(arbitrage_pairs)} cointegrated pairs out of {len(pairs):,} tested")
 
         return self.results['cointegration']
 
-    def systematic_strategies(self):
-        returns = self.data.pct_change().dropna()
+    @cached_stage('strategies')
+    @timed_stage('strategies')
+    def systematic_strategies(self, momentum_lookback=21, long_rank=0.6, short_rank=0.4,
+                              zscore_window=20, z_entry=2.0):
+        import numpy as np
+        import pandas as pd
+
+        returns = self.returns
 
-        momentum_lookback = 21
         momentum_scores = returns.rolling(momentum_lookback).sum()
         momentum_signals = momentum_scores.rank(axis=1, pct=True)
-        momentum_positions = np.where(momentum_signals > 0.6, 1,
-                                      np.where(momentum_signals < 0.4, -1, 0))
+        momentum_positions = np.where(momentum_signals > long_rank, 1,
+                                      np.where(momentum_signals < short_rank, -1, 0))
         momentum_positions = pd.DataFrame(momentum_positions, index=returns.index, columns=returns.columns)
         momentum_returns = (momentum_positions.shift(1) * returns).sum(axis=1)
-        momentum_sharpe = momentum_returns.mean() / momentum_returns.std() * np.sqrt(252)
+        momentum_sharpe = momentum_returns.mean() / momentum_returns.std() * np.sqrt(self.periods_per_year)
 
-        z_scores = (self.data - self.data.rolling(20).mean()) / self.data.rolling(20).std()
-        mean_rev_positions = np.where(z_scores < -2, 1, np.where(z_scores > 2, -1, 0))
+        z_scores = (self.data - self.data.rolling(zscore_window).mean()) / self.data.rolling(zscore_window).std()
+        mean_rev_positions = np.where(z_scores < -z_entry, 1, np.where(z_scores > z_entry, -1, 0))
         mean_rev_positions = pd.DataFrame(mean_rev_positions, index=self.data.index, columns=self.data.columns)
         mean_rev_returns = (mean_rev_positions.shift(1) * returns).sum(axis=1)
-        mean_rev_sharpe = mean_rev_returns.mean() / mean_rev_returns.std() * np.sqrt(252)
+        mean_rev_sharpe = mean_rev_returns.mean() / mean_rev_returns.std() * np.sqrt(self.periods_per_year)
 
         combined_returns = (momentum_returns + mean_rev_returns) / 2
-        combined_sharpe = combined_returns.mean() / combined_returns.std() * np.sqrt(252)
+        combined_sharpe = combined_returns.mean() / combined_returns.std() * np.sqrt(self.periods_per_year)
+
+        # Weights held over each return bar, for the costed backtest
+        combined_positions = (momentum_positions.shift(1).fillna(0)
+                              + mean_rev_positions.shift(1).reindex(returns.index).fillna(0)) / 2
 
         self.results['strategies'] = {
             'momentum_sharpe': momentum_sharpe,
@@ -97,39 +169,44 @@ class CryptoQuantLab:
             'combined_sharpe': combined_sharpe,
             'momentum_returns': momentum_returns,
             'mean_reversion_returns': mean_rev_returns,
-            'combined_returns': combined_returns
+            'combined_returns': combined_returns,
+            'combined_positions': combined_positions
         }
 
         print(f"Momentum Sharpe: {momentum_sharpe:.3f} | Mean reversion: {mean_rev_sharpe:.3f} | Combined: {combined_sharpe:.3f}")
 
         return self.results['strategies']
 
+    @timed_stage('sweep', counts=lambda sweep: {'combinations': len(sweep)})
+    def parameter_sweep(self, n_jobs=1, **grid):
+        """Score a grid of strategy parameters; see ``strategy_sweep.sweep_strategies``."""
+        from strategy_sweep import sweep_strategies
+
+        sweep = sweep_strategies(self.data.dropna(), n_jobs=n_jobs, periods_per_year=self.periods_per_year, **grid)
+        self.results['sweep'] = sweep
+
+        best = sweep.loc[sweep['combined_sharpe'].idxmax()]
+        print(f"Swept {len(sweep):,} parameter sets → best combined Sharpe {best['combined_sharpe']:.3f} "
+              f"(lookback {int(best['momentum_lookback'])}, z-window {int(best['zscore_window'])}, z-entry {best['z_entry']})")
+
+        return sweep
+
+    @cached_stage('portfolio')
+    @timed_stage('portfolio')
     def portfolio_optimization(self):
-        returns = self.data.pct_change().dropna()
-        mean_returns = returns.mean() * 252
-        cov_matrix = returns.cov() * 252
+        import numpy as np
+        from portfolio import max_sharpe
 
-        n_assets = len(returns.columns)
+        returns = self.returns
+        mean_returns = returns.mean() * self.periods_per_year
+        cov_matrix = returns.cov() * self.periods_per_year
 
         def portfolio_performance(weights):
             portfolio_return = np.sum(mean_returns * weights)
             portfolio_std = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
             return portfolio_return, portfolio_std
 
-        def negative_sharpe(weights):
-            p_return, p_std = portfolio_performance(weights)
-            return -(p_return / p_std)
-
-        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
-        bounds = tuple((0, 1) for _ in range(n_assets))
-
-        result = minimize(negative_sharpe, 
-                          x0=np.array([1/n_assets] * n_assets),
-                          method='SLSQP',
-                          bounds=bounds,
-                          constraints=constraints)
-
-        optimal_weights = result.x
+        optimal_weights = max_sharpe(mean_returns, cov_matrix)
         opt_return, opt_std = portfolio_performance(optimal_weights)
         opt_sharpe = opt_return / opt_std
 
@@ -144,42 +221,140 @@ class CryptoQuantLab:
 
         return self.results['portfolio']
 
-    def comprehensive_backtest(self):
-        returns = self.data.pct_change().dropna()
-        strategy_returns = self.results['strategies']['combined_returns']
-
-        total_return = (1 + strategy_returns).prod() - 1
-        annualized_return = (1 + strategy_returns).prod() ** (252 / len(strategy_returns)) - 1
-        volatility = strategy_returns.std() * np.sqrt(252)
-        sharpe_ratio = annualized_return / volatility
-
-        cumulative = (1 + strategy_returns).cumprod()
-        running_max = cumulative.expanding().max()
-        drawdown = (cumulative - running_max) / running_max
-        max_drawdown = drawdown.min()
+    @cached_stage('moments')
+    @timed_stage('moments')
+    def portfolio_moments(self, shrinkage=None):
+        """Annualized mean returns and covariance, memoized per dataset through the cache."""
+        from portfolio import annualized_moments
+
+        self.results['moments'] = annualized_moments(self.returns, shrinkage=shrinkage,
+                                                     periods_per_year=self.periods_per_year)
+        return self.results['moments']
+
+    @timed_stage('frontier')
+    def frontier_analysis(self, n_points=100, shrinkage=None, moments=None, **constraints):
+        """Efficient frontier under ``PortfolioConstraints`` keyword arguments.
+
+        ``moments`` takes already computed ``portfolio_moments``.
+        """
+        from portfolio import PortfolioConstraints, efficient_frontier
+
+        mean_returns, cov_matrix = moments if moments is not None else self.portfolio_moments(shrinkage=shrinkage)
+        constraints = PortfolioConstraints(self.data.columns, **constraints) if constraints else None
+        frontier = efficient_frontier(mean_returns, cov_matrix, n_points=n_points, constraints=constraints)
+        self.results['frontier'] = frontier
+
+        tangent = frontier['max_sharpe']
+        print(f"Frontier: {n_points} points from {frontier['volatilities'][0]*100:.2f}% to {frontier['volatilities'][-1]*100:.2f}% volatility, "
+              f"max Sharpe {tangent['sharpe_ratio']:.3f}")
+
+        return frontier
+
+    @cached_stage('walk_forward')
+    @timed_stage('walk_forward')
+    def walk_forward_optimization(self, window=None, rebalance=None, n_jobs=1):
+        """Re-optimize on a trailing ``window`` of bars (default one year) every ``rebalance`` bars (default a month)."""
+        from portfolio import walk_forward
+
+        returns = self.returns.dropna()
+        window = window or int(self.periods_per_year)
+        rebalance = rebalance or max(1, window // 12)
+        result = walk_forward(returns, window=window, rebalance=rebalance, n_jobs=n_jobs,
+                              periods_per_year=self.periods_per_year)
+        self.results['walk_forward'] = result
+
+        print(f"Walk-forward: {result['rebalances']} rebalances → out-of-sample Sharpe {result['sharpe_ratio']:.3f} "
+              f"with {result['annualized_return']*100:.2f}% return, {result['average_turnover']*100:.1f}% turnover per rebalance")
+
+        return result
+
+    @cached_stage('risk')
+    @timed_stage('risk', counts=lambda r: {'paths': r['n_paths']})
+    def risk_analysis(self, method='student_t', n_paths=100_000, horizon=None, garch=False, dof=5.0,
+                      block_size=1, confidence=(0.95, 0.99), n_jobs=1, seed=None):
+        """Monte Carlo VaR, CVaR and drawdowns of the optimal portfolio over ``horizon`` bars (default a year); see ``risk``."""
+        from risk import simulate_portfolio_risk
+
+        if 'portfolio' not in self.results:
+            self.portfolio_optimization()
+        mean_returns, cov_matrix = self.portfolio_moments()
+        weights = [self.results['portfolio']['optimal_weights'][asset] for asset in mean_returns.index]
+        horizon = horizon or int(self.periods_per_year)
+
+        result = simulate_portfolio_risk(weights, mean_returns, cov_matrix, returns=self.returns[mean_returns.index],
+                                         method=method, n_paths=n_paths, horizon=horizon,
+                                         periods_per_year=self.periods_per_year, dof=dof, garch=garch,
+                                         block_size=block_size, confidence=confidence, n_jobs=n_jobs, seed=seed)
+        self.results['risk'] = result
+
+        level = max(confidence)
+        print(f"Monte Carlo {method}{'-GARCH' if garch else ''} over {n_paths:,} paths x {horizon} bars → "
+              f"VaR{level:.0%} {result['var'][level]*100:.2f}% | CVaR{level:.0%} {result['cvar'][level]*100:.2f}% | "
+              f"median max drawdown {result['max_drawdown_percentiles'][50]*100:.2f}%")
+
+        return result
+
+    @cached_stage('backtest', requires=STAGE_REQUIRES['backtest'])
+    @timed_stage('backtest')
+    def comprehensive_backtest(self, fee_rate=0.001, slippage=0.0005):
+        import pandas as pd
+        from backtest import run_backtest
+
+        # Assets without a price yet are flat and earn nothing.
+        returns = self.returns.fillna(0)
+        positions = self.results['strategies']['combined_positions'].reindex(returns.index).fillna(0)
+
+        result = run_backtest(positions.to_numpy(), returns[positions.columns].to_numpy(),
+                              fee_rate=fee_rate, slippage=slippage, periods_per_year=self.periods_per_year)
+        stats = {name: value[0] for name, value in result.items() if value.ndim == 1}
+        max_drawdown = stats['max_drawdown']
+        sharpe_ratio = stats['sharpe_ratio']
 
         self.results['backtest'] = {
-            'total_return': total_return,
-            'annualized_return': annualized_return,
-            'volatility': volatility,
+            'total_return': stats['total_return'],
+            'annualized_return': stats['annualized_return'],
+            'volatility': stats['volatility'],
             'sharpe_ratio': sharpe_ratio,
             'max_drawdown': max_drawdown,
-            'total_trades': len(strategy_returns),
-            'win_rate': len(strategy_returns[strategy_returns > 0]) / len(strategy_returns)
+            'total_trades': int(stats['total_trades']),
+            'average_holding_period': stats['average_holding_period'],
+            'annual_turnover': stats['annual_turnover'],
+            'total_costs': stats['total_costs'],
+            'win_rate': stats['win_rate'],
+            'equity_curve': pd.Series(result['equity'][0], index=returns.index)
         }
 
-        print(f"Total return: {total_return*100:.2f}% | Sharpe: {sharpe_ratio:.3f} | Max drawdown: {max_drawdown*100:.2f}% | Win rate: {self.results['backtest']['win_rate']*100:.1f}%")
+        print(f"Total return: {stats['total_return']*100:.2f}% | Sharpe: {sharpe_ratio:.3f} | Max drawdown: {max_drawdown*100:.2f}% | "
+              f"Win rate: {stats['win_rate']*100:.1f}% | {int(stats['total_trades']):,} trades, {stats['total_costs']*100:.2f}% costs")
 
         return self.results['backtest']
 
+    @timed_stage('out_of_core_backtest', counts=lambda r: {'bars': len(r['equity_curve'])})
+    def out_of_core_backtest(self, source, chunk_rows=20_000, **params):
+        """Strategies and costed backtest streamed from a price matrix on disk; see ``out_of_core``."""
+        from out_of_core import chunked_backtest
+
+        result = chunked_backtest(source, periods_per_year=self.periods_per_year, chunk_rows=chunk_rows, **params)
+        self.results['out_of_core_backtest'] = result
+
+        print(f"Streamed {len(result['equity_curve']):,} bars → total return {result['total_return']*100:.2f}% | "
+              f"Sharpe: {result['sharpe_ratio']:.3f} | Max drawdown: {result['max_drawdown']*100:.2f}% | {result['total_trades']:,} trades")
+
+        return result
+
+    @cached_stage('arbitrage', requires=STAGE_REQUIRES['arbitrage'])
+    @timed_stage('arbitrage')
     def quantify_cointegration_arbitrage(self):
+        import numpy as np
+
         arbitrage_pairs = self.results['cointegration']['arbitrage_opportunities']
 
         opportunities = []
         for pair in arbitrage_pairs:
             asset1, asset2 = pair
-            prices1 = self.data[asset1]
-            prices2 = self.data[asset2]
+            overlap = self.data[[asset1, asset2]].dropna()
+            prices1 = overlap[asset1]
+            prices2 = overlap[asset2]
 
             slope = np.cov(prices1, prices2)[0,1] / np.var(prices2)
             spread = prices1 - slope * prices2
@@ -207,6 +382,20 @@ class CryptoQuantLab:
 
         return self.results['arbitrage']
 
+    def monitor_arbitrage(self, pairs=None, **kwargs):
+        """Live z-score monitor over the cointegrated pairs, warmed up on the loaded prices; see ``arbitrage_monitor``."""
+        from arbitrage_monitor import ArbitrageMonitor
+
+        if pairs is None:
+            pairs = self.results['cointegration']['arbitrage_opportunities']
+        monitor = ArbitrageMonitor(self.data.columns, pairs, **kwargs)
+        monitor.warm_up(self.data)
+
+        print(f"Monitoring {len(monitor.pairs)} pairs → {monitor.stats()['active_positions']} open signals after "
+              f"{len(self.data):,} warm-up bars")
+
+        return monitor
+
     def generate_summary_report(self):
         print(f"\n{'='*50}")
         print(f"CRYPTO QUANTLAB SUMMARY")
@@ -239,23 +428,125 @@ class CryptoQuantLab:
         print(f"{'='*50}\n")
 
 
-def main():
-    lab = CryptoQuantLab()
+STAGES = {
+    'cointegration': 'cointegration_analysis',
+    'strategies': 'systematic_strategies',
+    'portfolio': 'portfolio_optimization',
+    'backtest': 'comprehensive_backtest',
+    'arbitrage': 'quantify_cointegration_arbitrage',
+}
+
+
+def run_stages(data, period=None, stages=tuple(STAGES), stage_kwargs=None, results=None, progress=None,
+               interval='1d', profile=False):
+    """Run analysis stages on an already fetched frame, e.g. in a worker process.
+
+    ``results`` seeds earlier stage outputs so later stages can run on their
+    own. Stages that raise are left out of the returned results. Returns
+    ``(results, timings, profile_report)``; the report is ``None`` unless
+    ``profile`` is set, in which case the stages run under a sampling profiler.
+    """
+    lab = CryptoQuantLab(interval=interval)
+    lab.data = data
+    lab.period = period
+    lab.progress = progress
+    lab.results = dict(results or {})
+    stage_kwargs = stage_kwargs or {}
+    profiler = SamplingProfiler() if profile else contextlib.nullcontext()
+    with profiler:
+        for stage in stages:
+            started = time.perf_counter()
+            try:
+                getattr(lab, STAGES[stage])(**stage_kwargs.get(stage, {}))
+            except Exception as e:
+                lab.timings[stage] = {'wall_seconds': time.perf_counter() - started, 'failed': True}
+                print(f"{stage} stage failed: {e}")
+    return lab.results, lab.timings, profiler.report() if profile else None
+
+
+def run_risk(data, period=None, interval='1d', **kwargs):
+    """``risk_analysis`` on an already fetched frame, e.g. in a worker process.
+
+    Returns ``(risk, portfolio, timings)``.
+    """
+    lab = CryptoQuantLab(interval=interval)
+    lab.data = data
+    lab.period = period
+    result = lab.risk_analysis(**kwargs)
+    return result, lab.results['portfolio'], lab.timings
+
+
+def run_frontier(data, period=None, interval='1d', moments=None, **kwargs):
+    """``frontier_analysis`` on an already fetched frame, e.g. in a worker process.
+
+    Returns ``(frontier, timings)``.
+    """
+    lab = CryptoQuantLab(interval=interval)
+    lab.data = data
+    lab.period = period
+    return lab.frontier_analysis(moments=moments, **kwargs), lab.timings
+
+
+def with_prerequisites(stages):
+    """``stages`` plus the stages they read results from, in pipeline order."""
+    selected = set(stages)
+    for stage in stages:
+        selected.update(STAGE_REQUIRES.get(stage, ()))
+    return [stage for stage in STAGES if stage in selected]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='crypto-quantlab', description='Run the Crypto QuantLab analysis.')
+    parser.add_argument('--cryptos', nargs='+', help='tickers to analyze (default: BTC, ETH, ADA, SOL, LINK)')
+    parser.add_argument('--period', default='1y', help='history to fetch, e.g. 3mo, 1y, 5y')
+    parser.add_argument('--interval', default='1d', help='bar interval, e.g. 1d, 1h')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES),
+                        help='stages to run; stages they depend on are added')
+    parser.add_argument('--simulations', type=int, default=10000, help='bootstrap replicates for cointegration')
+    parser.add_argument('--seed', type=int, help='bootstrap seed')
+    parser.add_argument('--n-jobs', type=int, default=1,
+                        help='worker processes for cointegration, or for the jobs of a batch')
+    parser.add_argument('--alignment', choices=['common', 'pairwise'], default='common',
+                        help="'common' keeps timestamps every ticker has; 'pairwise' keeps each ticker's own history")
+    parser.add_argument('--float32', action='store_true', help='hold prices as float32')
+    parser.add_argument('--timings', action='store_true', help='print wall and CPU time per stage')
+    parser.add_argument('--batch', metavar='JOBS',
+                        help='JSON list of {"cryptos", "timeframe", "interval"} jobs to run instead')
+    parser.add_argument('--output', default='batch_results.parquet',
+                        help='results file for --batch (.parquet, .feather or .csv)')
+    args = parser.parse_args(argv)
+
+    store = None
+    if 'CRYPTO_QUANTLAB_CSV_DIR' in os.environ:
+        from price_store import CSVSource, PriceStore
+
+        store = PriceStore(source=CSVSource(os.environ['CRYPTO_QUANTLAB_CSV_DIR']))
+    if args.batch:
+        from batch import run_batch
+
+        with open(args.batch) as f:
+            jobs = json.load(f)
+        run_batch(jobs, args.output, stages=args.stages,
+                  stage_kwargs={'cointegration': {'n_simulations': args.simulations, 'seed': args.seed}},
+                  store=store, n_jobs=args.n_jobs, alignment=args.alignment, float32=args.float32)
+        return
+
+    lab = CryptoQuantLab(store=store, interval=args.interval, alignment=args.alignment, float32=args.float32)
+    if args.cryptos:
+        lab.cryptos = args.cryptos
 
     print("Fetching crypto data...\n")
-    lab.fetch_data()
-
-    lab.cointegration_analysis()
-    print()
-    lab.systematic_strategies()
-    print()
-    lab.portfolio_optimization()
-    print()
-    lab.comprehensive_backtest()
-    print()
-    lab.quantify_cointegration_arbitrage()
+    lab.fetch_data(period=args.period)
+
+    stage_kwargs = {'cointegration': {'n_simulations': args.simulations, 'seed': args.seed, 'n_jobs': args.n_jobs}}
+    for stage in with_prerequisites(args.stages):
+        getattr(lab, STAGES[stage])(**stage_kwargs.get(stage, {}))
+        print()
 
     lab.generate_summary_report()
+    if args.timings:
+        for stage, timing in lab.timings.items():
+            print(f"{stage:15s} {timing['wall_seconds']:8.3f}s wall {timing['cpu_seconds']:8.3f}s CPU")
 
 if __name__ == "__main__":
     main()
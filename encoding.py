@@ -0,0 +1,178 @@
+"""Response encoding for the API.
+
+Frames are converted column-at-a-time: one timestamp array plus one value
+array per ticker, optionally downsampled with LTTB and reduced to float32
+precision. Binary Arrow IPC and MessagePack bodies are offered when the
+optional ``pyarrow``/``msgpack`` packages are installed.
+
+``dumps`` serializes whole result trees with orjson when available, which
+handles NumPy scalars and arrays natively; otherwise ``jsonable`` converts
+them in bulk for the standard library encoder. Either way NaN and +/-inf
+become ``null`` so responses are always valid JSON.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_MEDIA_TYPE = 'application/json'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+
+def lttb_indices(values, n_out):
+    """Largest-Triangle-Three-Buckets row selection for a (rows, series) array.
+
+    Triangle areas are summed over all series after scaling each to its first
+    value, so the kept rows preserve the shape of every line on a shared
+    time axis. The first and last rows are always kept.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    n = len(values)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    y = values / np.where(values[0] == 0, 1, values[0])
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean(axis=0)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi, np.newaxis]) * (avg_y - y[a])).sum(axis=1)
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _float32_round(values):
+    """Round each column to float32's ~7 significant digits so JSON stays short."""
+    scale = np.nanmax(np.abs(values), axis=0)
+    digits = 7 - np.ceil(np.log10(np.where(scale > 0, scale, 1))).astype(int)
+    return np.column_stack([np.round(values[:, j], digits[j]) for j in range(values.shape[1])])
+
+
+def prepare_frame(frame, max_points=None, float32=False):
+    """Timestamps (epoch ms), value matrix and column names for ``frame``."""
+    values = frame.to_numpy(dtype=np.float32 if float32 else float)
+    timestamps = frame.index.values.astype('datetime64[ms]').astype(np.int64)
+    if max_points is not None and len(frame) > max_points:
+        keep = lttb_indices(values, max_points)
+        values, timestamps = values[keep], timestamps[keep]
+    return timestamps, values, list(frame.columns)
+
+
+def columnar_payload(timestamps, values, names, float32=False):
+    if float32:
+        values = _float32_round(values.astype(float))
+    columns = values.T.tolist()
+    return {
+        'timestamps': timestamps.tolist(),
+        'series': dict(zip(names, columns)),
+    }
+
+
+def row_payload(timestamps, values, names):
+    dates = np.datetime_as_string(timestamps.astype('datetime64[ms]'), unit='s')
+    return [{'date': date, **dict(zip(names, row))}
+            for date, row in zip(dates.tolist(), values.astype(float).tolist())]
+
+
+def available_media_types():
+    types = [JSON_MEDIA_TYPE]
+    for module, media_type in (('pyarrow', ARROW_MEDIA_TYPE), ('msgpack', MSGPACK_MEDIA_TYPE)):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        types.append(media_type)
+    return types
+
+
+def negotiate(accept):
+    """Pick the first media type in ``accept`` we can produce, else JSON."""
+    offered = available_media_types()
+    for part in (accept or '').split(','):
+        media_type = part.split(';')[0].strip()
+        if media_type in offered:
+            return media_type
+    return JSON_MEDIA_TYPE
+
+
+def encode_arrow(timestamps, values, names):
+    import pyarrow as pa
+
+    arrays = [pa.array(timestamps.astype('datetime64[ms]'))]
+    arrays += [pa.array(values[:, j]) for j in range(values.shape[1])]
+    table = pa.Table.from_arrays(arrays, names=['timestamp'] + names)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_msgpack(payload, float32=False):
+    import msgpack
+
+    return msgpack.packb(payload, use_single_float=float32)
+
+
+def _finite_list(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        return np.where(np.isfinite(values), values, None).tolist()
+    if values.dtype.kind == 'M':
+        return np.datetime_as_string(values, unit='s').tolist()
+    return values.tolist()
+
+
+def _fallback(obj):
+    """Convert the pandas/NumPy objects neither JSON encoder knows about."""
+    if isinstance(obj, pd.DataFrame):
+        return {str(column): obj[column].to_numpy() for column in obj.columns}
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.to_numpy()
+    if isinstance(obj, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(obj).isoformat()
+    if isinstance(obj, np.ndarray):
+        return _finite_list(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def jsonable(data):
+    """Plain-Python copy of ``data`` with arrays converted in one call each."""
+    if isinstance(data, dict):
+        return {str(k) if not isinstance(k, (str, int, float, bool)) else k: jsonable(v)
+                for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [jsonable(item) for item in data]
+    if isinstance(data, float):
+        return data if np.isfinite(data) else None
+    if isinstance(data, (np.ndarray, pd.Series, pd.Index)):
+        return _finite_list(np.asarray(data))
+    if isinstance(data, (str, int, bool)) or data is None:
+        return data
+    return jsonable(_fallback(data))
+
+
+def dumps(data):
+    """Serialize a result tree to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_fallback,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable(data), allow_nan=False, separators=(',', ':')).encode()
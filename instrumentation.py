@@ -0,0 +1,200 @@
+"""Timing, metrics and profiling for CryptoQuantLab stages and the API.
+
+``timed_stage`` records wall time, CPU time, rows processed and any stage
+specific counts (e.g. bootstrap replicates) into ``lab.timings``. The API
+folds those, plus its own request timings and the cache counters, into the
+``METRICS`` registry, which renders the Prometheus text format for
+``/metrics``.
+
+``SamplingProfiler`` samples one thread's Python stack at a fixed interval
+and reports the hottest functions and folded stacks (flamegraph input)
+without any third-party profiler.
+"""
+import collections
+import functools
+import sys
+import threading
+import time
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def timed_stage(stage, counts=None):
+    """Record timing for a CryptoQuantLab method in ``self.timings[stage]``.
+
+    ``counts(result)`` may return extra totals (e.g. ``{'replicates': n}``);
+    each is reported alongside a per-second rate.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            wall, cpu = time.perf_counter(), time.process_time()
+            result = method(self, *args, **kwargs)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            timing = {
+                'wall_seconds': wall,
+                'cpu_seconds': cpu,
+                'rows': len(self.data) if self.data is not None else 0,
+            }
+            for name, value in (counts(result) if counts else {}).items():
+                timing[name] = value
+                timing[f"{name}_per_second"] = value / wall if wall > 0 else 0.0
+            self.timings[stage] = timing
+            return result
+        return wrapper
+    return decorator
+
+
+def _format_value(value):
+    # Full precision: ':g' keeps 6 digits, so large counters stop moving for rate().
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+class Metrics:
+    """Thread-safe counters and histograms with Prometheus text rendering."""
+
+    def __init__(self, prefix='crypto_quantlab', buckets=DURATION_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = collections.defaultdict(float)
+        self._histograms = {}
+
+    def _name(self, name, help):
+        name = f"{self.prefix}_{name}"
+        self._help.setdefault(name, help)
+        return name
+
+    def inc(self, name, value=1.0, help='', **labels):
+        with self._lock:
+            self._counters[(self._name(name, help), tuple(labels.items()))] += value
+
+    def observe(self, name, value, help='', **labels):
+        with self._lock:
+            key = (self._name(name, help), tuple(labels.items()))
+            histogram = self._histograms.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def record_stage(self, stage, timing):
+        if timing.get('cached'):
+            return
+        if timing.get('failed'):
+            self.inc('stage_failures_total', help='Analysis stages that raised.', stage=stage)
+        self.observe('stage_duration_seconds', timing['wall_seconds'],
+                     help='Wall time of analysis stages.', stage=stage)
+        self.inc('stage_cpu_seconds_total', timing.get('cpu_seconds', 0.0),
+                 help='CPU time of analysis stages.', stage=stage)
+        self.inc('stage_rows_total', timing.get('rows', 0), help='Price rows processed by analysis stages.',
+                 stage=stage)
+        if 'replicates' in timing:
+            self.inc('bootstrap_replicates_total', timing['replicates'],
+                     help='Johansen bootstrap replicates run.')
+
+    def render(self, collected=()):
+        """Prometheus text exposition.
+
+        ``collected`` adds values read at scrape time, as
+        ``(name, kind, help, labels, value)`` tuples.
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        seen = set()
+
+        def header(name, kind, help):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {help or self._help.get(name, '')}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, 'counter', None)
+            lines.append(f"{name}{_format_labels(dict(labels))} {_format_value(value)}")
+        for (name, labels), (bucket_counts, total, count) in histograms:
+            header(name, 'histogram', None)
+            labels = dict(labels)
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': f'{bound:g}'})} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for name, kind, help, labels, value in collected:
+            name = f"{self.prefix}_{name}"
+            header(name, kind, help)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+
+class SamplingProfiler:
+    """Samples a thread's stack every ``interval`` seconds while active.
+
+    Use as a context manager around the code to profile, from the thread
+    running it; ``report()`` summarizes the samples.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+        self.started = self.elapsed = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return False
+
+    def report(self, top=25):
+        """Hottest functions by own and cumulative samples, plus folded stacks."""
+        own, cumulative = collections.Counter(), collections.Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                cumulative[frame] += count
+        total = sum(self.samples.values())
+        return {
+            'elapsed_seconds': self.elapsed,
+            'samples': total,
+            'interval_seconds': self.interval,
+            'self': [{'frame': frame, 'samples': n, 'fraction': n / total} for frame, n in own.most_common(top)],
+            'cumulative': [{'frame': frame, 'samples': n, 'fraction': n / total}
+                           for frame, n in cumulative.most_common(top)],
+            'folded': [f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common(top * 4)],
+        }
@@ -0,0 +1,250 @@
+"""Job execution for the API server.
+
+Blocking fetches run on a thread pool and CPU-bound analysis on a bounded
+process pool, so the event loop stays free for cheap endpoints. Identical
+in-flight jobs share one computation, and new jobs are refused with
+``Overloaded`` once ``max_pending`` distinct jobs are queued or running.
+
+Background jobs (``JobRunner.start``) record an ordered list of events that
+pollers and streams read; running jobs nobody has looked at for
+``abandon_after`` seconds are cancelled. Cancelling a job that reports
+progress from a worker process also stops the worker at its next report.
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import queue
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Too many analyses in flight, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Cancelled(Exception):
+    """Raised in a worker process by its reporter once the job was cancelled."""
+
+
+def _put_progress(progress_queue, cancelled, *values):
+    if cancelled.is_set():
+        raise Cancelled()
+    progress_queue.put(values)
+
+
+class Job:
+    def __init__(self, kind, params=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = 'queued'
+        self.events = []
+        self.result = None
+        self.error = None
+        self.task = None
+        self.created = self.touched = time.time()
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def touch(self):
+        self.touched = time.time()
+
+    def emit(self, event, data):
+        self.events.append({'event': event, 'data': data})
+        self._changed.set()
+
+    async def wait(self, seen, timeout=None):
+        """Wait until there are more than ``seen`` events or the job finished."""
+        while len(self.events) <= seen and not self.finished:
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def snapshot(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created': self.created,
+            'events': [e['event'] for e in self.events],
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobRunner:
+    def __init__(self, max_workers=None, max_fetch_threads=None, max_pending=None, retry_after=5,
+                 abandon_after=60, keep_for=600):
+        env = os.environ.get
+        self.max_workers = max_workers or int(env('CRYPTO_QUANTLAB_WORKERS', os.cpu_count() or 1))
+        self.max_fetch_threads = max_fetch_threads or int(env('CRYPTO_QUANTLAB_FETCH_THREADS', 4))
+        self.max_pending = max_pending or int(env('CRYPTO_QUANTLAB_MAX_PENDING', 4 * self.max_workers))
+        self.retry_after = retry_after
+        self.abandon_after = abandon_after
+        self.keep_for = keep_for
+        self._processes = None
+        self._threads = None
+        self._manager = None
+        self._reaper = None
+        self._inflight = {}
+        self.jobs = {}
+
+    @property
+    def processes(self):
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._processes
+
+    @property
+    def threads(self):
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_fetch_threads,
+                                               thread_name_prefix='fetch')
+        return self._threads
+
+    def progress_channel(self):
+        """A queue worker processes can report into, and a picklable reporter for it.
+
+        The reporter raises ``Cancelled`` in the worker once ``run_reporting``
+        on the same queue has been cancelled.
+        """
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+        progress_queue = self._manager.Queue()
+        progress_queue.cancelled = self._manager.Event()
+        return progress_queue, functools.partial(_put_progress, progress_queue, progress_queue.cancelled)
+
+    async def run_in_thread(self, fn, *args, **kwargs):
+        """Run blocking I/O on the fetch thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.threads, functools.partial(fn, *args, **kwargs))
+
+    async def run_in_process(self, fn, *args, **kwargs):
+        """Run a picklable CPU-bound function on the process pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.processes, functools.partial(fn, *args, **kwargs))
+
+    async def run(self, key, job, *args):
+        """Await ``job(*args)``, sharing it with any in-flight job under ``key``."""
+        task = self._inflight.get(key)
+        if task is None:
+            if len(self._inflight) >= self.max_pending:
+                raise Overloaded(self.retry_after)
+            task = asyncio.ensure_future(job(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def run_reporting(self, progress_queue, on_progress, fn, *args, **kwargs):
+        """``run_in_process`` while relaying whatever the worker puts on ``progress_queue``."""
+        future = asyncio.ensure_future(self.run_in_process(fn, *args, **kwargs))
+        while True:
+            try:
+                await asyncio.wait([future], timeout=0.1)
+            except asyncio.CancelledError:
+                # The worker stops at its next report instead of running to the end.
+                progress_queue.cancelled.set()
+                future.cancel()
+                raise
+            while True:
+                try:
+                    on_progress(*progress_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if future.done():
+                return future.result()
+
+    def _active_jobs(self):
+        return sum(not job.finished for job in self.jobs.values())
+
+    def reap(self):
+        """Cancel abandoned running jobs and forget old finished ones."""
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if not job.finished and now - job.touched > self.abandon_after:
+                self.cancel(job_id)
+            elif job.finished and now - job.touched > self.keep_for:
+                del self.jobs[job_id]
+
+    def start_reaper(self, interval=None):
+        """Call ``reap`` every ``interval`` seconds from a background task."""
+        interval = interval or max(self.abandon_after / 4, 1)
+
+        async def reaper():
+            while True:
+                await asyncio.sleep(interval)
+                self.reap()
+
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.ensure_future(reaper())
+
+    def start(self, kind, job_fn, *args, params=None):
+        """Start ``job_fn(job, *args)`` in the background and return the ``Job``."""
+        self.reap()
+        if self._active_jobs() + len(self._inflight) >= self.max_pending:
+            raise Overloaded(self.retry_after)
+        job = Job(kind, params)
+
+        async def runner():
+            job.status = 'running'
+            try:
+                job.result = await job_fn(job, *args)
+                job.status = 'done'
+            except asyncio.CancelledError:
+                job.status = 'cancelled'
+            except Exception as e:
+                job.error = getattr(e, 'detail', None) or str(e)
+                job.status = 'failed'
+            job.emit(job.status, {'error': job.error} if job.error else {})
+
+        def cancelled_before_start(task):
+            if task.cancelled() and not job.finished:
+                job.status = 'cancelled'
+                job.emit(job.status, {})
+
+        self.jobs[job.id] = job
+        job.task = asyncio.ensure_future(runner())
+        job.task.add_done_callback(cancelled_before_start)
+        return job
+
+    def get(self, job_id):
+        self.reap()
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.touch()
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.task.cancel()
+        return True
+
+    def stats(self):
+        return {
+            'in_flight': len(self._inflight),
+            'background_jobs': self._active_jobs(),
+            'max_pending': self.max_pending,
+            'workers': self.max_workers,
+        }
+
+    def shutdown(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for pool in (self._processes, self._threads):
+            if pool is not None:
+                pool.shutdown(wait=False)
+        if self._manager is not None:
+            self._manager.shutdown()
+        self._processes = self._threads = self._manager = self._reaper = None
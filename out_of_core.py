@@ -0,0 +1,116 @@
+"""Strategy and backtest stages over price histories too large for memory.
+
+Prices are streamed in row chunks from a memory-mapped ``.npy`` matrix
+(e.g. written by ``PriceStore.export_matrix``), a Parquet file read one
+batch at a time, or an in-memory array. Each chunk is prefixed with the last
+few rows of the previous one so rolling windows see their full history, run
+through the vectorized signal functions of ``strategy_sweep`` and fed into a
+``CostedBacktest``, so only one chunk of prices and signals is ever held.
+Positions, P&L and statistics match ``systematic_strategies`` and
+``comprehensive_backtest`` on the same data.
+"""
+from pathlib import Path
+
+import numpy as np
+
+from backtest import CostedBacktest
+from strategy_sweep import mean_reversion_positions, momentum_positions
+
+INDEX_COLUMNS = ('Date', 'Datetime', 'timestamp', '__index_level_0__')
+
+
+def _is_parquet(source):
+    return isinstance(source, (str, Path)) and str(source).endswith('.parquet')
+
+
+def source_shape(source, columns=None):
+    """(rows, assets) of a price source without reading it."""
+    if _is_parquet(source):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(source)
+        names = columns or [n for n in parquet.schema_arrow.names if n not in INDEX_COLUMNS]
+        return parquet.metadata.num_rows, len(names)
+    if isinstance(source, (str, Path)):
+        source = np.load(source, mmap_mode='r')
+    return source.shape
+
+
+def iter_price_chunks(source, chunk_rows=20_000, columns=None):
+    """Yield float64 (rows, assets) blocks of a price source in order."""
+    if _is_parquet(source):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(source)
+        names = columns or [n for n in parquet.schema_arrow.names if n not in INDEX_COLUMNS]
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=names):
+            yield np.column_stack([column.to_numpy(zero_copy_only=False) for column in batch.columns]).astype(float)
+        return
+
+    values = np.load(source, mmap_mode='r') if isinstance(source, (str, Path)) else source
+    for start in range(0, len(values), chunk_rows):
+        yield np.asarray(values[start:start + chunk_rows], dtype=float)
+
+
+def _merge_moments(moments, values):
+    """Fold a block of values into running (count, mean, M2) per column."""
+    count, mean, m2 = moments
+    n = values.shape[-1]
+    block_mean = values.mean(axis=-1)
+    block_m2 = ((values - block_mean[..., np.newaxis]) ** 2).sum(axis=-1)
+    total = count + n
+    delta = block_mean - mean
+    return total, mean + delta * n / total, m2 + block_m2 + delta ** 2 * count * n / total
+
+
+def chunked_backtest(source, momentum_lookback=21, long_rank=0.6, short_rank=0.4,
+                     zscore_window=20, z_entry=2.0, fee_rate=0.001, slippage=0.0005,
+                     periods_per_year=365, chunk_rows=20_000, columns=None):
+    """Run the combined momentum/mean-reversion book over ``source`` chunk by chunk.
+
+    Returns the per-leg Sharpe ratios, the costed backtest statistics and the
+    equity curve (one value per return bar).
+    """
+    n_rows, n_assets = source_shape(source, columns)
+    backtest = CostedBacktest(1, n_rows - 1, n_assets, fee_rate, slippage, periods_per_year)
+    overlap = max(momentum_lookback + 1, zscore_window)
+    # Running (count, mean, M2) of each leg's P&L; like systematic_strategies,
+    # the mean-reversion series starts with a flat day on the first price bar.
+    legs = (np.array([0.0, 1.0]), np.zeros(2), np.zeros(2))
+
+    tail = np.empty((0, n_assets))
+    previous_momentum = np.zeros((1, n_assets))
+    for block in iter_price_chunks(source, chunk_rows, columns):
+        prices = np.vstack([tail, block])
+        # Return row k is held with momentum from row k - 1 and the z-score
+        # signal from price row k; rows before ``first`` belong to the last chunk.
+        first = max(len(tail) - 1, 0)
+        if len(prices) - 1 > first:
+            returns = prices[1:] / prices[:-1] - 1
+            momentum = momentum_positions(returns, [momentum_lookback], [(long_rank, short_rank)])[0].astype(float)
+            mean_rev = mean_reversion_positions(prices, [zscore_window], [z_entry])[0].astype(float)
+
+            new_returns = returns[first:]
+            held_momentum = np.vstack([previous_momentum, momentum[first:-1]])
+            held_mean_rev = mean_rev[first:-1]
+            held = (held_momentum + held_mean_rev) / 2
+            backtest.update(held[np.newaxis], new_returns)
+            leg_pnl = np.stack([np.einsum('bn,bn->b', held_momentum, new_returns),
+                                np.einsum('bn,bn->b', held_mean_rev, new_returns)])
+            legs = _merge_moments(legs, leg_pnl)
+            previous_momentum = momentum[-1:]
+
+        tail = prices[-overlap:]
+
+    count, mean, m2 = legs
+    with np.errstate(divide='ignore', invalid='ignore'):
+        leg_sharpe = mean / np.sqrt(m2 / (count - 1)) * np.sqrt(periods_per_year)
+    result = backtest.result()
+    stats = {name: value[0] for name, value in result.items() if value.ndim == 1}
+    return {
+        'momentum_sharpe': leg_sharpe[0],
+        'mean_reversion_sharpe': leg_sharpe[1],
+        **stats,
+        'total_trades': int(stats['total_trades']),
+        'equity_curve': result['equity'][0],
+    }
@@ -0,0 +1,218 @@
+"""Batched Engle-Granger cointegration screening over all asset pairs.
+
+Reproduces ``statsmodels.tsa.stattools.coint`` (constant trend, AIC lag
+selection) for every pair at once:
+
+* hedge regressions come from a single covariance matrix of the log prices,
+* the ADF regressions on the residual matrix are solved from stacked Gram
+  matrices, with AIC evaluated for every lag length from one Cholesky factor,
+* MacKinnon approximate p-values are evaluated on the whole vector of
+  statistics.
+
+Pairs can be pre-filtered by correlation, spread over a process pool in
+chunks, and adjusted for multiple testing. Log prices with NaN (a frame
+aligned pairwise) are tested on each pair's overlapping rows.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from alignment import valid_ranges
+
+SQRTEPS = np.sqrt(np.finfo(float).eps)
+# Fewest shared rows a pair needs to be tested.
+MIN_OVERLAP = 30
+
+
+def default_maxlag(nobs):
+    """Schwert's rule as used by ``adfuller`` for a no-trend regression."""
+    return min(nobs // 2 - 1, int(np.ceil(12.0 * np.power(nobs / 100.0, 1 / 4.0))))
+
+
+def _adf_gram(resid, diffs, lag):
+    """Gram matrices of [level, lagged diffs 1..lag, diff] on the lag-``lag`` sample.
+
+    ``resid`` and ``diffs`` are (series, time) so every regressor is a
+    contiguous slice.
+    """
+    length = resid.shape[1]
+    rows = [resid[:, lag:length - 1]]
+    rows += [diffs[:, lag - k:length - 1 - k] for k in range(1, lag + 1)]
+    rows.append(diffs[:, lag:])
+    design = np.stack(rows, axis=1)  # (series, lag + 2, nobs)
+    return design @ np.swapaxes(design, 1, 2), design.shape[2]
+
+
+def _cholesky(gram):
+    try:
+        return np.linalg.cholesky(gram), np.zeros(len(gram), dtype=bool)
+    except np.linalg.LinAlgError:
+        factors = np.full_like(gram, np.nan)
+        failed = np.zeros(len(gram), dtype=bool)
+        for p in range(len(gram)):
+            try:
+                factors[p] = np.linalg.cholesky(gram[p])
+            except np.linalg.LinAlgError:
+                failed[p] = True
+        return factors, failed
+
+
+def adf_statistics(resid, maxlag=None):
+    """ADF t-statistics (no deterministic terms, AIC lag choice) per column.
+
+    Returns ``(stats, lags)``; columns whose regressions are singular get NaN.
+    """
+    resid = np.ascontiguousarray(np.asarray(resid, dtype=float).T)
+    n_series, length = resid.shape
+    if maxlag is None:
+        maxlag = default_maxlag(length)
+    diffs = np.diff(resid, axis=1)
+
+    # AIC over lag lengths 0..maxlag on the common maxlag sample. The squared
+    # entries of the last Cholesky row are the RSS reductions of each regressor
+    # added in order, so every nested model's RSS comes from one factorization.
+    gram, nobs = _adf_gram(resid, diffs, maxlag)
+    factor, failed = _cholesky(gram)
+    explained = np.cumsum(factor[:, -1, :-1] ** 2, axis=1)
+    rss = gram[:, -1, -1][:, np.newaxis] - explained
+    k = np.arange(1, maxlag + 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aic = nobs * (np.log(2 * np.pi) + np.log(rss / nobs) + 1) + 2 * k
+    aic[~np.isfinite(aic)] = np.inf
+    lags = np.argmin(aic, axis=1)
+
+    stats = np.full(n_series, np.nan)
+    for lag in np.unique(lags[~failed]):
+        cols = np.flatnonzero((lags == lag) & ~failed)
+        gram, nobs = _adf_gram(resid[cols], diffs[cols], lag)
+        gxx, gxy = gram[:, :-1, :-1], gram[:, :-1, -1]
+        try:
+            inv = np.linalg.inv(gxx)
+        except np.linalg.LinAlgError:
+            continue
+        beta = np.einsum('pij,pj->pi', inv, gxy)
+        rss = gram[:, -1, -1] - np.einsum('pi,pi->p', beta, gxy)
+        sigma2 = rss / (nobs - (lag + 1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats[cols] = beta[:, 0] / np.sqrt(sigma2 * inv[:, 0, 0])
+    return stats, lags
+
+
+def mackinnon_pvalues(stats, regression='c', n_series=2):
+    """Vectorized ``statsmodels.tsa.adfvalues.mackinnonp``."""
+    from statsmodels.tsa.adfvalues import (_tau_largeps, _tau_maxs, _tau_mins,
+                                           _tau_smallps, _tau_stars)
+
+    stats = np.asarray(stats, dtype=float)
+    i = n_series - 1
+    small = np.polyval(np.asarray(_tau_smallps[regression][i])[::-1], stats)
+    large = np.polyval(np.asarray(_tau_largeps[regression][i])[::-1], stats)
+    p = norm.cdf(np.where(stats <= _tau_stars[regression][i], small, large))
+    p = np.where(stats > _tau_maxs[regression][i], 1.0, p)
+    p = np.where(stats < _tau_mins[regression][i], 0.0, p)
+    return np.where(np.isnan(stats), np.nan, p)
+
+
+def adjust_pvalues(pvalues, method='fdr_bh'):
+    """Multiple-testing adjustment: 'fdr_bh', 'bonferroni' or None."""
+    pvalues = np.asarray(pvalues, dtype=float)
+    if method is None or len(pvalues) == 0:
+        return pvalues
+    valid = ~np.isnan(pvalues)
+    m = valid.sum()
+    adjusted = np.full_like(pvalues, np.nan)
+    if method == 'bonferroni':
+        adjusted[valid] = np.minimum(pvalues[valid] * m, 1.0)
+    elif method == 'fdr_bh':
+        p = pvalues[valid]
+        order = np.argsort(p)
+        scaled = p[order] * m / np.arange(1, m + 1)
+        scaled = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+        out = np.empty_like(p)
+        out[order] = scaled
+        adjusted[valid] = out
+    else:
+        raise ValueError(f"Unknown adjustment method: {method}")
+    return adjusted
+
+
+def _screen_chunk(centered, cov, left, right, maxlag):
+    beta = cov[left, right] / cov[right, right]
+    resid = centered[:, left] - beta * centered[:, right]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsquared = cov[left, right] ** 2 / (cov[left, left] * cov[right, right])
+    stats, lags = adf_statistics(resid, maxlag)
+    # coint() skips the ADF for near-collinear pairs and reports -inf.
+    collinear = rsquared >= 1 - 100 * SQRTEPS
+    stats[collinear] = -np.inf
+    return beta, stats, lags
+
+
+def screen_pairs(log_prices, min_correlation=None, maxlag=None, alpha=0.05,
+                 correction='fdr_bh', chunk_size=500, n_jobs=1):
+    """Engle-Granger test every pair of columns of ``log_prices``.
+
+    Returns one row per tested pair with the hedge ratio, ADF statistic,
+    chosen lag, raw and adjusted p-values and whether the adjusted p-value is
+    below ``alpha``. Pairs with ``|corr| < min_correlation``, or that share
+    fewer than ``MIN_OVERLAP`` rows of prices, are not tested.
+    """
+    names = list(log_prices.columns)
+    values = log_prices.to_numpy(dtype=float)
+    left, right = np.triu_indices(len(names), k=1)
+
+    # Each pair is tested on the rows where both assets have prices: every row,
+    # unless the frame was aligned pairwise. Pairs sharing a window are
+    # screened together.
+    first, stop = valid_ranges(values)
+    windows = np.stack([np.maximum(first[left], first[right]), np.minimum(stop[left], stop[right])], axis=1)
+    bounds, group = np.unique(windows, axis=0, return_inverse=True)
+
+    args, order = [], []
+    for g, (lo, hi) in enumerate(bounds):
+        members = np.flatnonzero(group.ravel() == g)
+        if hi - lo < MIN_OVERLAP:
+            continue
+        columns, local = np.unique(np.concatenate([left[members], right[members]]), return_inverse=True)
+        pair_left, pair_right = local[:len(members)], local[len(members):]
+        block = values[lo:hi, columns]
+        centered = block - block.mean(axis=0)
+        cov = centered.T @ centered
+        if min_correlation is not None:
+            std = np.sqrt(np.diag(cov))
+            corr = cov[pair_left, pair_right] / (std[pair_left] * std[pair_right])
+            keep = np.abs(corr) >= min_correlation
+            members, pair_left, pair_right = members[keep], pair_left[keep], pair_right[keep]
+        for s in range(0, len(members), chunk_size):
+            args.append((centered, cov, pair_left[s:s + chunk_size], pair_right[s:s + chunk_size], maxlag))
+            order.append(members[s:s + chunk_size])
+
+    if n_jobs == 1 or len(args) <= 1:
+        chunks = [_screen_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            chunks = list(pool.map(_screen_chunk, *zip(*args)))
+
+    if chunks:
+        tested = np.concatenate(order)
+        restore = np.argsort(tested, kind='stable')
+        beta, stats, lags = (np.concatenate(parts)[restore] for parts in zip(*chunks))
+        left, right = left[tested[restore]], right[tested[restore]]
+    else:
+        beta = stats = lags = np.array([])
+        left = right = np.array([], dtype=int)
+    pvalues = mackinnon_pvalues(stats, regression='c', n_series=2)
+    adjusted = adjust_pvalues(pvalues, correction)
+
+    return pd.DataFrame({
+        'asset1': [names[i] for i in left],
+        'asset2': [names[j] for j in right],
+        'hedge_ratio': beta,
+        'adf_statistic': stats,
+        'lag': lags.astype(int),
+        'pvalue': pvalues,
+        'pvalue_adjusted': adjusted,
+        'significant': adjusted < alpha,
+    })
@@ -0,0 +1,314 @@
+"""Mean-variance portfolio construction.
+
+``max_sharpe`` is the max-Sharpe SLSQP solve used by
+``CryptoQuantLab.portfolio_optimization``, with the analytic gradient of the
+Sharpe ratio instead of finite differences. ``walk_forward`` re-solves it on
+rolling windows: window sums are slid forward with rank-one updates, each
+solve warm-starts from the previous weights, and blocks of rebalance dates
+are solved in parallel.
+
+``efficient_frontier`` traces minimum-variance portfolios between the
+minimum-variance and maximum-return ends, each solve warm-started from the
+previous point, under the per-asset bounds, group caps and turnover limit
+described by ``PortfolioConstraints``.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linprog, minimize
+
+
+def ledoit_wolf(returns):
+    """Ledoit-Wolf shrinkage of the (biased) sample covariance towards a scaled identity."""
+    x = np.asarray(returns, dtype=float)
+    x = x - x.mean(axis=0)
+    n_samples, n_features = x.shape
+    emp_cov = x.T @ x / n_samples
+    mu = np.trace(emp_cov) / n_features
+
+    x2 = x ** 2
+    delta = (np.sum(emp_cov ** 2) - 2 * mu * np.trace(emp_cov) + n_features * mu ** 2) / n_features
+    beta = (np.sum(x2.T @ x2) / n_samples - np.sum(emp_cov ** 2)) / (n_features * n_samples)
+    beta = min(beta, delta)
+    shrinkage = 0.0 if beta == 0 else beta / delta
+
+    shrunk = (1 - shrinkage) * emp_cov
+    shrunk.flat[::n_features + 1] += shrinkage * mu
+    return shrunk, shrinkage
+
+
+def annualized_moments(returns, shrinkage=None, periods_per_year=365):
+    """Annualized mean returns and covariance; ``shrinkage='ledoit_wolf'`` shrinks the covariance.
+
+    Missing returns are skipped: means per asset, covariances over each
+    pair's shared rows, and Ledoit-Wolf over the rows where all are present.
+    """
+    mean_returns = returns.mean() * periods_per_year
+    if shrinkage is None:
+        cov_matrix = returns.cov() * periods_per_year
+    elif shrinkage == 'ledoit_wolf':
+        cov, _ = ledoit_wolf(returns.dropna().to_numpy())
+        cov_matrix = pd.DataFrame(cov * periods_per_year, index=returns.columns, columns=returns.columns)
+    else:
+        raise ValueError(f"Unknown covariance shrinkage: {shrinkage}")
+    return mean_returns, cov_matrix
+
+
+class PortfolioConstraints:
+    """Linear constraints on portfolio weights, as SLSQP and ``linprog`` inputs.
+
+    ``bounds`` applies to every asset unless overridden in ``asset_bounds``;
+    ``groups`` maps a name to ``{'assets': [...], 'min': ..., 'max': ...}``.
+    A turnover limit adds buy/sell variables so that
+    ``sum(|w - current_weights|) <= max_turnover`` stays linear.
+    """
+
+    def __init__(self, assets, bounds=(0, 1), asset_bounds=None, groups=None,
+                 max_turnover=None, current_weights=None):
+        self.assets = list(assets)
+        n = len(self.assets)
+        self.n_assets = n
+        self.turnover = max_turnover is not None
+        n_vars = 3 * n if self.turnover else n
+
+        weight_bounds = [tuple(bounds)] * n
+        for asset, asset_bound in (asset_bounds or {}).items():
+            weight_bounds[self.assets.index(asset)] = tuple(asset_bound)
+        self.bounds = weight_bounds + [(0, None)] * (n_vars - n)
+
+        eq_rows, eq_rhs = [np.r_[np.ones(n), np.zeros(n_vars - n)]], [1.0]
+        ub_rows, ub_rhs = [], []
+        for group in (groups or {}).values():
+            row = np.zeros(n_vars)
+            row[[self.assets.index(asset) for asset in group['assets']]] = 1
+            if group.get('max') is not None:
+                ub_rows.append(row)
+                ub_rhs.append(group['max'])
+            if group.get('min') is not None:
+                ub_rows.append(-row)
+                ub_rhs.append(-group['min'])
+
+        if self.turnover:
+            if current_weights is None:
+                current_weights = np.full(n, 1 / n)
+            elif isinstance(current_weights, dict):
+                current_weights = [current_weights.get(asset, 0.0) for asset in self.assets]
+            self.current_weights = np.asarray(current_weights, dtype=float)
+            # w - buys + sells = current weights
+            eq_rows.extend(np.hstack([np.eye(n), -np.eye(n), np.eye(n)]))
+            eq_rhs.extend(self.current_weights)
+            ub_rows.append(np.r_[np.zeros(n), np.ones(2 * n)])
+            ub_rhs.append(max_turnover)
+
+        self.A_eq, self.b_eq = np.array(eq_rows), np.array(eq_rhs)
+        self.A_ub = np.array(ub_rows).reshape(-1, n_vars)
+        self.b_ub = np.array(ub_rhs)
+
+    def slsqp(self, extra=()):
+        """SLSQP constraint dicts, optionally with extra ``(row, rhs)`` equalities."""
+        A_eq = np.vstack([self.A_eq] + [row for row, _ in extra])
+        b_eq = np.r_[self.b_eq, [rhs for _, rhs in extra]]
+        constraints = [{'type': 'eq', 'fun': lambda x: A_eq @ x - b_eq, 'jac': lambda x: A_eq}]
+        if len(self.b_ub):
+            constraints.append({'type': 'ineq', 'fun': lambda x: self.b_ub - self.A_ub @ x,
+                                'jac': lambda x: -self.A_ub})
+        return constraints
+
+    def pad(self, vector):
+        """Extend a per-asset vector with zeros for the turnover variables."""
+        return np.r_[vector, np.zeros(len(self.bounds) - self.n_assets)]
+
+    def lift(self, weights):
+        """Full variable vector for given weights."""
+        if not self.turnover:
+            return np.asarray(weights, dtype=float)
+        change = weights - self.current_weights
+        return np.r_[weights, np.maximum(change, 0), np.maximum(-change, 0)]
+
+    def linprog(self, c):
+        result = linprog(self.pad(c), A_ub=self.A_ub if len(self.b_ub) else None,
+                         b_ub=self.b_ub if len(self.b_ub) else None,
+                         A_eq=self.A_eq, b_eq=self.b_eq, bounds=self.bounds, method='highs')
+        if result.status != 0:
+            raise ValueError(f"Portfolio constraints are infeasible: {result.message}")
+        return result.x
+
+
+def _negative_sharpe(weights, mean_returns, cov_matrix):
+    cov_w = cov_matrix @ weights
+    p_return = mean_returns @ weights
+    p_std = np.sqrt(weights @ cov_w)
+    value = -p_return / p_std
+    grad = -(mean_returns / p_std - p_return * cov_w / p_std ** 3)
+    return value, grad
+
+
+def max_sharpe(mean_returns, cov_matrix, x0=None, constraints=None):
+    """Max-Sharpe weights; long-only and fully invested unless ``constraints`` say otherwise."""
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    n_assets = len(mean_returns)
+    if x0 is None:
+        x0 = np.full(n_assets, 1 / n_assets)
+
+    if constraints is None:
+        result = minimize(_negative_sharpe, x0=x0, args=(mean_returns, cov_matrix),
+                          jac=True, method='SLSQP',
+                          bounds=[(0, 1)] * n_assets,
+                          constraints=({'type': 'eq', 'fun': lambda x: np.sum(x) - 1,
+                                        'jac': lambda x: np.ones_like(x)},))
+        return result.x
+
+    def objective(x):
+        value, grad = _negative_sharpe(x[:n_assets], mean_returns, cov_matrix)
+        return value, constraints.pad(grad)
+
+    result = minimize(objective, x0=constraints.lift(x0), jac=True, method='SLSQP',
+                      bounds=constraints.bounds, constraints=constraints.slsqp())
+    return result.x[:n_assets]
+
+
+def _variance(x, cov_matrix, n_assets):
+    weights = x[:n_assets]
+    cov_w = cov_matrix @ weights
+    grad = np.zeros_like(x)
+    grad[:n_assets] = 2 * cov_w
+    return weights @ cov_w, grad
+
+
+def efficient_frontier(mean_returns, cov_matrix, n_points=100, constraints=None):
+    """Minimum-variance portfolios for ``n_points`` evenly spaced target returns.
+
+    Returns target returns, volatilities, Sharpe ratios and the weight matrix
+    (points x assets), plus the constrained max-Sharpe portfolio.
+    """
+    assets = list(getattr(mean_returns, 'index', range(len(mean_returns))))
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    n_assets = len(mean_returns)
+    if constraints is None:
+        constraints = PortfolioConstraints(assets)
+
+    # The feasible vertex maximizing return bounds the frontier; start from it
+    # to find the minimum-variance end.
+    top = constraints.linprog(-mean_returns)
+    result = minimize(_variance, x0=top, args=(cov_matrix, n_assets), jac=True, method='SLSQP',
+                      bounds=constraints.bounds, constraints=constraints.slsqp())
+    x = result.x
+    targets = np.linspace(mean_returns @ x[:n_assets], mean_returns @ top[:n_assets], n_points)
+
+    weights = np.empty((n_points, n_assets))
+    return_row = constraints.pad(mean_returns)
+    for k, target in enumerate(targets):
+        if 0 < k < n_points - 1:
+            result = minimize(_variance, x0=x, args=(cov_matrix, n_assets), jac=True, method='SLSQP',
+                              bounds=constraints.bounds, constraints=constraints.slsqp([(return_row, target)]))
+            x = result.x
+        elif k == n_points - 1:
+            x = top
+        weights[k] = x[:n_assets]
+
+    volatilities = np.sqrt(np.einsum('ki,ij,kj->k', weights, cov_matrix, weights))
+    returns = weights @ mean_returns
+    best = weights[np.argmax(returns / volatilities)]
+    tangent = max_sharpe(mean_returns, cov_matrix, x0=best, constraints=constraints)
+    tangent_return, tangent_std = mean_returns @ tangent, np.sqrt(tangent @ cov_matrix @ tangent)
+    return {
+        'returns': returns,
+        'volatilities': volatilities,
+        'sharpe_ratios': returns / volatilities,
+        'weights': pd.DataFrame(weights, columns=assets),
+        'max_sharpe': {
+            'weights': dict(zip(assets, tangent)),
+            'expected_return': tangent_return,
+            'volatility': tangent_std,
+            'sharpe_ratio': tangent_return / tangent_std,
+        },
+    }
+
+
+class WindowMoments:
+    """Sum and cross-product of a sliding block of return rows.
+
+    Rows are shifted by a fixed reference so the running sums stay small,
+    and rows entering/leaving the window are applied as rank-one updates.
+    """
+
+    def __init__(self, rows, shift):
+        self.shift = shift
+        centered = rows - shift
+        self.count = len(rows)
+        self.total = centered.sum(axis=0)
+        self.cross = centered.T @ centered
+
+    def slide(self, entering, leaving):
+        for row in entering - self.shift:
+            self.total += row
+            self.cross += np.outer(row, row)
+        for row in leaving - self.shift:
+            self.total -= row
+            self.cross -= np.outer(row, row)
+
+    def mean_cov(self):
+        centered_mean = self.total / self.count
+        cov = (self.cross - self.count * np.outer(centered_mean, centered_mean)) / (self.count - 1)
+        return centered_mean + self.shift, cov
+
+
+def _solve_block(returns, starts, window, periods_per_year):
+    """Weights for rebalance dates ``starts`` (row indices), warm-starting along the block."""
+    shift = returns[:window].mean(axis=0)
+    weights = np.empty((len(starts), returns.shape[1]))
+    x0 = None
+    for k, start in enumerate(starts):
+        if k == 0 or slid >= window:
+            # rebuild once a full window has been slid so rounding cannot accumulate
+            moments, slid = WindowMoments(returns[start - window:start], shift), 0
+        else:
+            previous = starts[k - 1]
+            moments.slide(returns[previous:start], returns[previous - window:start - window])
+            slid += start - previous
+        mean, cov = moments.mean_cov()
+        x0 = max_sharpe(mean * periods_per_year, cov * periods_per_year, x0)
+        weights[k] = x0
+    return weights
+
+
+def walk_forward(returns, window=365, rebalance=30, n_jobs=1, periods_per_year=365):
+    """Re-optimize max-Sharpe weights every ``rebalance`` rows on the trailing ``window``.
+
+    Weights chosen at a rebalance date are held (at fixed proportions) until
+    the next one, so every reported return is out of sample.
+    """
+    values = returns.to_numpy(dtype=float)
+    starts = np.arange(window, len(values), rebalance)
+    if len(starts) == 0:
+        raise ValueError(f"Need more than {window} rows of returns for walk-forward optimization")
+
+    blocks = [block for block in np.array_split(starts, max(1, min(n_jobs, len(starts)))) if len(block)]
+    if len(blocks) == 1:
+        weights = _solve_block(values, starts, window, periods_per_year)
+    else:
+        with ProcessPoolExecutor(max_workers=len(blocks)) as pool:
+            futures = [pool.submit(_solve_block, values, block, window, periods_per_year)
+                       for block in blocks]
+            weights = np.vstack([f.result() for f in futures])
+
+    held = np.repeat(weights, np.diff(np.append(starts, len(values))), axis=0)
+    oos_returns = pd.Series(np.einsum('ij,ij->i', held, values[window:]),
+                            index=returns.index[window:])
+    weights = pd.DataFrame(weights, index=returns.index[starts], columns=returns.columns)
+    turnover = np.abs(np.diff(weights.to_numpy(), axis=0)).sum(axis=1).mean() if len(weights) > 1 else 0.0
+
+    annualized_return = oos_returns.mean() * periods_per_year
+    volatility = oos_returns.std() * np.sqrt(periods_per_year)
+    return {
+        'weights': weights,
+        'returns': oos_returns,
+        'annualized_return': annualized_return,
+        'volatility': volatility,
+        'sharpe_ratio': annualized_return / volatility,
+        'average_turnover': float(turnover),
+        'rebalances': len(weights),
+    }
@@ -0,0 +1,204 @@
+"""Local on-disk store of close prices at daily or intraday intervals.
+
+Each ticker and interval lives in two memory-mapped ``.npy`` files
+(timestamps and closes) under the store root. Reads slice those files
+directly; refreshes only ask the data source for bars from the last stored
+timestamp onwards, and at most once per ``max_age`` (or per bar, if bars are
+shorter) per ticker. ``export_matrix`` aligns tickers into one float32
+``.npy`` file column by column, for out-of-core processing.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bars import interval_seconds
+
+
+def period_start(period, end):
+    """First timestamp covered by a yfinance-style ``period`` ending at ``end``."""
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(year=end.year, month=1, day=1)
+    units = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+    for suffix, unit in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return end - pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def period_start_ns(period, interval='1d'):
+    """Nanosecond timestamp where ``period`` of ``interval`` bars ending now starts (None for 'max')."""
+    end = pd.Timestamp.now()
+    if interval == '1d':
+        end = end.normalize()
+    start = period_start(period, end)
+    return None if start is None else start.value
+
+
+def _close_frame(data, tickers):
+    if isinstance(data, pd.Series):
+        data = data.to_frame(tickers[0])
+    if data.index.tz is not None:
+        data.index = data.index.tz_convert(None)
+    return data
+
+
+class YFinanceSource:
+    def fetch(self, tickers, start=None, interval='1d'):
+        import yfinance as yf
+
+        kwargs = {'period': 'max'} if start is None else {'start': start.strftime('%Y-%m-%d')}
+        data = yf.download(list(tickers), progress=False, interval=interval, **kwargs)
+        if data is None or data.empty:
+            return pd.DataFrame()
+        return _close_frame(data["Close"], list(tickers))
+
+
+class CSVSource:
+    """Reads ``<directory>/<ticker>.csv`` (daily) or ``<ticker>.<interval>.csv`` files
+    with a date column and ``Close``."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def fetch(self, tickers, start=None, interval='1d'):
+        series = {}
+        suffix = '' if interval == '1d' else f".{interval}"
+        for ticker in tickers:
+            path = self.directory / f"{ticker}{suffix}.csv"
+            if not path.exists():
+                continue
+            frame = pd.read_csv(path, index_col=0, parse_dates=True)
+            close = frame['Close']
+            series[ticker] = close if start is None else close[close.index >= start]
+        if not series:
+            return pd.DataFrame()
+        return _close_frame(pd.DataFrame(series), list(tickers))
+
+
+class PriceStore:
+    def __init__(self, root=None, source=None, max_age=86400):
+        root = root or os.environ.get('CRYPTO_QUANTLAB_DATA', '~/.crypto_quantlab/prices')
+        self.root = Path(root).expanduser()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.source = source or YFinanceSource()
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _paths(self, ticker, interval='1d'):
+        name = ticker if interval == '1d' else f"{ticker}.{interval}"
+        return self.root / f"{name}.dates.npy", self.root / f"{name}.close.npy"
+
+    def _read(self, ticker, interval='1d'):
+        dates_path, close_path = self._paths(ticker, interval)
+        if not dates_path.exists():
+            return None, None
+        return np.load(dates_path, mmap_mode='r'), np.load(close_path, mmap_mode='r')
+
+    def _write(self, ticker, dates, closes, interval='1d'):
+        for path, values in zip(self._paths(ticker, interval), (dates, closes)):
+            tmp = path.with_suffix('.tmp.npy')
+            np.save(tmp, values)
+            os.replace(tmp, path)
+
+    def _is_stale(self, ticker, interval='1d'):
+        dates_path, _ = self._paths(ticker, interval)
+        max_age = min(self.max_age, interval_seconds(interval))
+        return not dates_path.exists() or time.time() - dates_path.stat().st_mtime > max_age
+
+    def last_timestamp(self, ticker, interval='1d'):
+        dates, _ = self._read(ticker, interval)
+        return None if dates is None or len(dates) == 0 else pd.Timestamp(int(dates[-1]))
+
+    def _merge(self, ticker, new, interval='1d'):
+        """Replace stored bars from ``new``'s first timestamp onwards with ``new``.
+
+        An empty ``new`` still rewrites the files, so a ticker the source has
+        no prices for is stored empty and not fetched again until it is stale.
+        """
+        with self._lock:
+            dates, closes = self._read(ticker, interval)
+            new_dates = new.index.values.astype('datetime64[ns]').astype(np.int64)
+            if dates is not None:
+                keep = dates < new_dates[0] if len(new_dates) else slice(None)
+                new_dates = np.concatenate([dates[keep], new_dates])
+                new_closes = np.concatenate([closes[keep], new.values])
+            else:
+                new_closes = new.values.astype(float)
+            self._write(ticker, new_dates, new_closes, interval)
+
+    def refresh(self, tickers, force=False, interval='1d'):
+        """Append bars newer than what is stored, one source call per start date.
+
+        The last stored bar is re-requested because a bar is only final once
+        its interval has closed. Downloads run without the store lock, so
+        concurrent refreshes fetch in parallel; only the merge into the
+        stored files is serialized.
+        """
+        stale = [t for t in tickers if force or self._is_stale(t, interval)]
+        by_start = {}
+        for ticker in stale:
+            by_start.setdefault(self.last_timestamp(ticker, interval), []).append(ticker)
+
+        for start, group in by_start.items():
+            fetched = self.source.fetch(group, start=start, interval=interval)
+            for ticker in group:
+                new = fetched[ticker].dropna() if ticker in fetched else pd.Series(dtype=float)
+                self._merge(ticker, new, interval)
+
+    def load(self, tickers, period='1y', refresh=True, interval='1d', strict=True):
+        """Close prices for ``tickers`` over ``period``, one column per ticker.
+
+        Raises ``ValueError`` naming the tickers without prices in ``period``,
+        unless ``strict`` is false, in which case they are left out.
+        """
+        if refresh:
+            self.refresh(tickers, interval=interval)
+
+        start_ns = period_start_ns(period, interval)
+        series, missing = {}, []
+        for ticker in tickers:
+            dates, closes = self._read(ticker, interval)
+            lo = 0 if start_ns is None or dates is None else int(np.searchsorted(dates, start_ns))
+            if dates is None or lo == len(dates):
+                missing.append(ticker)
+                continue
+            series[ticker] = pd.Series(np.array(closes[lo:]),
+                                       index=pd.DatetimeIndex(np.array(dates[lo:]).astype('datetime64[ns]')))
+        if missing and strict:
+            raise ValueError(f"No {interval} data for {', '.join(missing)}")
+        frame = pd.DataFrame(series)
+        frame.index.name = 'Date'
+        return frame
+
+    def export_matrix(self, tickers, path, period='max', interval='1d', refresh=True):
+        """Write closes on the timestamps all ``tickers`` share to a (bars, tickers) float32 ``.npy``.
+
+        Columns are filled one ticker at a time into a memory-mapped file, so
+        memory use stays at one column. Returns the shared timestamps.
+        """
+        if refresh:
+            self.refresh(tickers, interval=interval)
+        start_ns = period_start_ns(period, interval)
+
+        shared = None
+        for ticker in tickers:
+            dates, _ = self._read(ticker, interval)
+            if dates is None or len(dates) == 0:
+                raise ValueError(f"No {interval} data stored for {ticker}")
+            shared = np.asarray(dates) if shared is None else np.intersect1d(shared, dates, assume_unique=True)
+        if start_ns is not None:
+            shared = shared[shared >= start_ns]
+
+        matrix = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                           shape=(len(shared), len(tickers)))
+        for j, ticker in enumerate(tickers):
+            dates, closes = self._read(ticker, interval)
+            matrix[:, j] = closes[np.searchsorted(dates, shared)]
+        matrix.flush()
+        return pd.DatetimeIndex(shared.astype('datetime64[ns]'))
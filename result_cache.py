@@ -0,0 +1,160 @@
+"""In-process memoization of CryptoQuantLab stage results.
+
+Entries are keyed by stage, sorted tickers, timeframe, a hash of the price
+frame and the stage arguments. They are evicted least-recently-used once the
+entry count or the approximate memory cap is exceeded, and expire at the next
+bar close (of the lab's bar interval) so a new bar always triggers a
+recompute.
+"""
+import functools
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from bars import interval_seconds
+
+
+def frame_version(data):
+    """Content hash of a price frame, including column order and index."""
+    import pandas as pd
+
+    digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    digest.update('|'.join(map(str, data.columns)).encode())
+    return digest.hexdigest()
+
+
+def next_bar_close(now, bar_seconds=86400):
+    return (now // bar_seconds + 1) * bar_seconds
+
+
+def _sizeof(obj):
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        return int(np.sum(obj.memory_usage(deep=True)))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_sizeof(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+class ResultCache:
+    def __init__(self, max_entries=512, max_bytes=256 * 1024 ** 2, ttl=None, bar_seconds=86400):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bar_seconds = bar_seconds
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _count(self, stage, outcome):
+        counters = self._counters.setdefault(stage, {'hits': 0, 'misses': 0})
+        counters[outcome] += 1
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, stage, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self._count(stage, 'misses')
+                return None
+            self._entries.move_to_end(key)
+            self._count(stage, 'hits')
+            return entry[0]
+
+    def put(self, key, value, bar_seconds=None):
+        now = time.time()
+        expires = next_bar_close(now, bar_seconds or self.bar_seconds)
+        if self.ttl is not None:
+            expires = min(expires, now + self.ttl)
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, expires, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'stages': {stage: dict(c) for stage, c in self._counters.items()},
+            }
+
+
+def _bar_seconds(interval):
+    return None if interval is None else interval_seconds(interval)
+
+
+def stage_key(lab, stage, args=(), kwargs=None, upstream=()):
+    """Cache key for running ``stage`` on ``lab``'s current frame.
+
+    ``upstream`` holds the keys of the stage results ``stage`` reads, so a
+    change to their arguments changes this key too.
+    """
+    return (stage, tuple(sorted(lab.data.columns)), lab.period, lab.interval, lab.data_version,
+            tuple(args), tuple(sorted((kwargs or {}).items())), tuple(upstream))
+
+
+def stage_keys(lab, stages, stage_kwargs=None, requires=None):
+    """``stage_key`` for each of ``stages``, keyed on the stages it ``requires`` as well."""
+    stage_kwargs, requires = stage_kwargs or {}, requires or {}
+    keys = {}
+
+    def key(stage):
+        if stage not in keys:
+            upstream = tuple(key(required) for required in requires.get(stage, ()))
+            keys[stage] = stage_key(lab, stage, (), stage_kwargs.get(stage), upstream)
+        return keys[stage]
+
+    return {stage: key(stage) for stage in stages}
+
+
+def cached_stage(stage, requires=()):
+    """Memoize a CryptoQuantLab stage through ``self.cache`` when one is set.
+
+    ``requires`` names the stages whose ``self.results`` the method reads;
+    their keys become part of this stage's key. Without a known key for one
+    of them (results set by hand), the stage runs uncached.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            upstream = tuple(self.result_keys.get(required) for required in requires)
+            if self.cache is None or self.data is None or None in upstream:
+                self.result_keys.pop(stage, None)
+                return method(self, *args, **kwargs)
+            key = stage_key(self, stage, args, kwargs, upstream)
+            result = self.cache.get(stage, key)
+            if result is None:
+                result = method(self, *args, **kwargs)
+                self.cache.put(key, result, bar_seconds=_bar_seconds(self.interval))
+            self.results[stage] = result
+            self.result_keys[stage] = key
+            return result
+        return wrapper
+    return decorator
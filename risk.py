@@ -0,0 +1,209 @@
+"""Monte Carlo value-at-risk, expected shortfall and drawdown distributions.
+
+Paths are simulated for a constant-weight (rebalanced every bar) portfolio.
+Its bar return is ``w'r``, so only one number per path and bar is drawn, not
+one per asset. With ``L`` the Cholesky factor of the per-bar covariance,
+``w'(mu + L z) = w'mu + (L'w)'z`` is normal with scale ``|L'w|``. This is
+exact for the normal and multivariate Student-t models (the t mixes every
+asset with one chi-square draw), and ``bootstrap`` resamples the historical
+portfolio returns directly. ``garch=True`` adds GARCH(1,1) volatility
+fitted to the historical portfolio returns, drawing normal or t shocks, or
+resampling its standardized residuals (filtered historical simulation).
+
+Paths are generated ``chunk_size`` at a time, as float32 (paths, bars)
+blocks of at most ``BLOCK_ELEMENTS`` values, so memory stays bounded for
+any horizon. Only each path's terminal return and maximum drawdown are
+kept. Chunk ``i`` draws from the ``i``-th child of
+``SeedSequence(seed)``, so a seeded run gives the same numbers whatever
+``n_jobs`` is.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.optimize import minimize
+from scipy.signal import lfilter
+
+METHODS = ('normal', 'student_t', 'bootstrap')
+# Simulated returns held at once per chunk (float32), bounding memory whatever the horizon.
+BLOCK_ELEMENTS = 8 * 2 ** 20
+
+
+def cholesky_factor(cov):
+    """Lower Cholesky factor of ``cov``, clipping negative eigenvalues first when it is not PSD."""
+    cov = np.asarray(cov, dtype=float)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        # e.g. a pairwise-complete covariance of assets with different histories
+        values, vectors = np.linalg.eigh(cov)
+        values = np.maximum(values, 1e-12 * max(values.max(), 1e-12))
+        return np.linalg.cholesky((vectors * values) @ vectors.T)
+
+
+def fit_garch(returns):
+    """GARCH(1,1) on demeaned ``returns`` by Gaussian quasi-maximum likelihood.
+
+    Returns ``(omega, alpha, beta)``, the conditional variances and the
+    variance forecast for the next bar.
+    """
+    x = np.asarray(returns, dtype=float)
+    x = x - x.mean()
+    sample_var = x.var()
+
+    def variances(params):
+        # sigma2[t + 1] = omega + alpha * x[t]^2 + beta * sigma2[t], from sigma2[0] = sample variance;
+        # omega is fitted in units of the sample variance so all three parameters are O(1).
+        omega, alpha, beta = params
+        forecasts, _ = lfilter([1.0], [1.0, -beta], omega * sample_var + alpha * x ** 2, zi=[beta * sample_var])
+        return np.concatenate([[sample_var], forecasts])
+
+    def neg_loglik(params):
+        sigma2 = variances(params)[:-1]
+        return 0.5 * np.sum(np.log(sigma2) + x ** 2 / sigma2)
+
+    fit = minimize(neg_loglik, x0=[0.1, 0.1, 0.8], method='SLSQP',
+                   bounds=[(1e-6, 10.0), (0.0, 1.0), (0.0, 1.0)],
+                   constraints=[{'type': 'ineq', 'fun': lambda p: 0.999 - p[1] - p[2]}])
+    sigma2 = variances(fit.x)
+    omega, alpha, beta = fit.x
+    return (float(omega * sample_var), float(alpha), float(beta)), sigma2[:-1], float(sigma2[-1])
+
+
+def _shocks(rng, method, size, dof, residuals, block_size):
+    """Unit-variance shocks (or resampled residuals) of shape ``size``."""
+    if method == 'normal':
+        return rng.standard_normal(size, dtype=np.float32)
+    if method == 'student_t':
+        # z / sqrt(chi2 / dof), rescaled to unit variance; chi2 = 2 * gamma(dof / 2)
+        shocks = rng.standard_normal(size, dtype=np.float32)
+        shocks /= np.sqrt(rng.standard_gamma(dof / 2, size, dtype=np.float32) * np.float32(2 / (dof - 2)))
+        return shocks
+    n_paths, horizon = size
+    if block_size == 1:
+        return residuals[rng.integers(0, len(residuals), size)]
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, len(residuals) - block_size + 1, (n_paths, n_blocks))
+    idx = (starts[:, :, np.newaxis] + np.arange(block_size)).reshape(n_paths, -1)[:, :horizon]
+    return residuals[idx]
+
+
+def _simulate_chunk(n_paths, horizon, seed_seq, method, mean, scale, dof, residuals, block_size, garch):
+    """Terminal return and maximum drawdown of ``n_paths`` simulated paths."""
+    rng = np.random.default_rng(seed_seq)
+    # Bars simulated per step, so a step holds about BLOCK_ELEMENTS values
+    # (whole bootstrap blocks); log wealth, its running peak and the GARCH
+    # variance carry over between steps.
+    step = max(BLOCK_ELEMENTS // n_paths // block_size, 1) * block_size
+    log_value = np.zeros(n_paths, dtype=np.float32)
+    peak = np.zeros(n_paths, dtype=np.float32)
+    max_drawdown = np.zeros(n_paths, dtype=np.float32)
+    if garch is not None:
+        omega, alpha, beta, sigma2_next = garch
+        sigma2 = np.full(n_paths, sigma2_next, dtype=np.float32)
+
+    for start in range(0, horizon, step):
+        shocks = _shocks(rng, method, (n_paths, min(step, horizon - start)), dof, residuals, block_size)
+        if garch is None:
+            returns = shocks if method == 'bootstrap' else mean + scale * shocks
+        else:
+            returns = np.empty_like(shocks)
+            for t in range(shocks.shape[1]):
+                innovation = np.sqrt(sigma2) * shocks[:, t]
+                returns[:, t] = mean + innovation
+                sigma2 = omega + alpha * innovation ** 2 + beta * sigma2
+
+        # Log wealth; a bar can't lose more than everything.
+        np.log1p(np.maximum(returns, -0.999999, out=returns), out=returns)
+        returns[:, 0] += log_value
+        path = np.cumsum(returns, axis=1, out=returns)
+        running_peak = np.maximum.accumulate(np.maximum(path, peak[:, np.newaxis]), axis=1)
+        np.minimum(max_drawdown, np.subtract(path, running_peak, out=running_peak).min(axis=1), out=max_drawdown)
+        log_value, peak = path[:, -1].copy(), np.maximum(peak, path.max(axis=1))
+    return np.expm1(log_value), np.expm1(max_drawdown)
+
+
+def _tail(losses, confidence):
+    var = float(np.quantile(losses, confidence))
+    return var, float(losses[losses >= var].mean())
+
+
+def simulate_portfolio_risk(weights, mean_returns=None, cov_matrix=None, returns=None, method='normal',
+                            n_paths=100_000, horizon=365, periods_per_year=365, dof=5.0, garch=False,
+                            block_size=1, confidence=(0.95, 0.99), chunk_size=20_000, n_jobs=1, seed=None,
+                            bins=50):
+    """Simulate ``n_paths`` portfolio paths of ``horizon`` bars and summarize their risk.
+
+    ``mean_returns`` and ``cov_matrix`` are annualized (as from
+    ``portfolio.annualized_moments``). ``returns`` holds historical bar
+    returns, one column per asset; ``bootstrap`` and ``garch`` need it.
+    VaR and CVaR are losses over the horizon, as positive fractions of the
+    starting value, per confidence level.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown simulation method: {method} (use one of {', '.join(METHODS)})")
+    if method == 'student_t' and dof <= 2:
+        raise ValueError("Student-t needs dof > 2 for a finite variance")
+    weights = np.asarray(weights, dtype=float)
+
+    history = None
+    if returns is not None:
+        history = np.asarray(returns, dtype=float)
+        history = history[~np.isnan(history).any(axis=1)] @ weights
+    if (method == 'bootstrap' or garch) and (history is None or len(history) < 2 * block_size):
+        raise ValueError(f"{'GARCH' if garch else 'Bootstrap'} simulation needs historical returns")
+
+    if mean_returns is not None and cov_matrix is not None:
+        mean = float(np.asarray(mean_returns, dtype=float) @ weights) / periods_per_year
+        scale = float(np.linalg.norm(cholesky_factor(np.asarray(cov_matrix, dtype=float) / periods_per_year).T @ weights))
+    elif history is not None:
+        mean, scale = float(history.mean()), float(history.std(ddof=1))
+    else:
+        raise ValueError("Pass mean_returns and cov_matrix, or historical returns")
+
+    garch_params, garch_state, residuals = None, None, None
+    if garch:
+        (omega, alpha, beta), sigma2, sigma2_next = fit_garch(history)
+        garch_params = {'omega': omega, 'alpha': alpha, 'beta': beta,
+                        'annualized_volatility': float(np.sqrt(sigma2_next * periods_per_year))}
+        residuals = ((history - history.mean()) / np.sqrt(sigma2)).astype(np.float32)
+        garch_state = (np.float32(omega), np.float32(alpha), np.float32(beta), sigma2_next)
+    elif method == 'bootstrap':
+        residuals = history.astype(np.float32)
+
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(size, horizon, s, method, np.float32(mean), np.float32(scale), dof, residuals, block_size,
+             garch_state)
+            for size, s in zip(sizes, seeds)]
+    if n_jobs == 1 or len(args) <= 1:
+        chunks = [_simulate_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            chunks = list(pool.map(_simulate_chunk, *zip(*args)))
+    terminal = np.concatenate([c[0] for c in chunks])
+    drawdown = np.concatenate([c[1] for c in chunks])
+
+    losses = -terminal
+    tails = {level: _tail(losses, level) for level in confidence}
+    return_counts, return_edges = np.histogram(terminal, bins=bins)
+    drawdown_counts, drawdown_edges = np.histogram(drawdown, bins=bins)
+    return {
+        'method': method,
+        'garch': garch_params,
+        'n_paths': int(n_paths),
+        'horizon': int(horizon),
+        'expected_return': float(terminal.mean()),
+        'volatility': float(terminal.std()),
+        'probability_of_loss': float((terminal < 0).mean()),
+        'var': {level: tails[level][0] for level in confidence},
+        'cvar': {level: tails[level][1] for level in confidence},
+        'return_percentiles': dict(zip((1, 5, 25, 50, 75, 95, 99),
+                                       np.percentile(terminal, (1, 5, 25, 50, 75, 95, 99)).tolist())),
+        'expected_max_drawdown': float(drawdown.mean()),
+        'max_drawdown_percentiles': dict(zip((50, 75, 95, 99),
+                                             np.percentile(drawdown, (50, 25, 5, 1)).tolist())),
+        'return_histogram': {'counts': return_counts, 'edges': return_edges},
+        'max_drawdown_histogram': {'counts': drawdown_counts, 'edges': drawdown_edges},
+    }
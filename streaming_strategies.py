@@ -0,0 +1,126 @@
+"""Bar-by-bar momentum and mean-reversion engine.
+
+Produces the same positions and P&L as ``CryptoQuantLab.systematic_strategies``
+but updates in O(assets) per bar: ring buffers hold the last ``window``
+returns and prices, momentum uses a rolling sum, and the price z-score uses a
+sliding-window Welford mean/variance. Sums are recomputed exactly from the
+buffers each time a buffer wraps, so floating-point drift cannot accumulate.
+"""
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+
+class RollingWindow:
+    """Fixed-length ring buffer per asset with running sum, mean and M2."""
+
+    def __init__(self, window, n_assets):
+        self.window = window
+        self.buffer = np.zeros((window, n_assets))
+        self.count = 0
+        self.head = 0
+        self.total = np.zeros(n_assets)
+        self.mean = np.zeros(n_assets)
+        self.m2 = np.zeros(n_assets)
+
+    @property
+    def full(self):
+        return self.count >= self.window
+
+    def push(self, x):
+        old = self.buffer[self.head].copy()
+        self.buffer[self.head] = x
+        self.head = (self.head + 1) % self.window
+
+        if not self.full:
+            self.count += 1
+            delta = x - self.mean
+            self.mean = self.mean + delta / self.count
+            self.m2 = self.m2 + delta * (x - self.mean)
+            self.total = self.total + x
+        elif self.head == 0:
+            self._resync()
+        else:
+            old_mean = self.mean
+            self.mean = old_mean + (x - old) / self.window
+            self.m2 = self.m2 + (x - old) * (x - self.mean + old - old_mean)
+            self.total = self.total + x - old
+
+    def _resync(self):
+        self.total = self.buffer.sum(axis=0)
+        self.mean = self.total / self.window
+        self.m2 = ((self.buffer - self.mean) ** 2).sum(axis=0)
+
+    def std(self):
+        if self.count < 2:
+            return np.full(len(self.mean), np.nan)
+        return np.sqrt(np.maximum(self.m2, 0) / (self.count - 1))
+
+
+class StreamingStrategyEngine:
+    def __init__(self, assets, momentum_lookback=21, zscore_window=20,
+                 long_rank=0.6, short_rank=0.4, z_entry=2.0):
+        self.assets = list(assets)
+        self.long_rank = long_rank
+        self.short_rank = short_rank
+        self.z_entry = z_entry
+        n = len(self.assets)
+        self.momentum = RollingWindow(momentum_lookback, n)
+        self.prices = RollingWindow(zscore_window, n)
+        self.last_price = None
+        self.positions = {'momentum': np.zeros(n), 'mean_reversion': np.zeros(n)}
+
+    def _as_array(self, bar):
+        if isinstance(bar, (dict, pd.Series)):
+            return np.array([bar[asset] for asset in self.assets], dtype=float)
+        return np.asarray(bar, dtype=float)
+
+    def update(self, bar):
+        """Feed one bar of prices; return ``(positions, pnl)``.
+
+        ``pnl`` is earned on this bar by the positions held from the previous
+        bar, and is ``None`` for the very first bar.
+        """
+        price = self._as_array(bar)
+        pnl = None
+        momentum_positions = np.zeros(len(price))
+
+        if self.last_price is not None:
+            returns = price / self.last_price - 1
+            momentum_pnl = float(np.dot(self.positions['momentum'], returns))
+            mean_rev_pnl = float(np.dot(self.positions['mean_reversion'], returns))
+            pnl = {
+                'momentum': momentum_pnl,
+                'mean_reversion': mean_rev_pnl,
+                'combined': (momentum_pnl + mean_rev_pnl) / 2,
+            }
+
+            self.momentum.push(returns)
+            if self.momentum.full:
+                ranks = rankdata(self.momentum.total) / len(price)
+                momentum_positions = np.where(ranks > self.long_rank, 1.0,
+                                              np.where(ranks < self.short_rank, -1.0, 0.0))
+
+        self.prices.push(price)
+        mean_rev_positions = np.zeros(len(price))
+        if self.prices.full:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z = (price - self.prices.mean) / self.prices.std()
+            mean_rev_positions = np.where(z < -self.z_entry, 1.0,
+                                          np.where(z > self.z_entry, -1.0, 0.0))
+
+        self.last_price = price
+        self.positions = {'momentum': momentum_positions, 'mean_reversion': mean_rev_positions}
+        return self.positions, pnl
+
+    def run(self, data):
+        """Replay a price frame bar by bar; P&L series on the returns index."""
+        rows = {'momentum': [], 'mean_reversion': [], 'combined': []}
+        index = []
+        for timestamp, bar in zip(data.index, data[self.assets].to_numpy(dtype=float)):
+            _, pnl = self.update(bar)
+            if pnl is not None:
+                index.append(timestamp)
+                for name in rows:
+                    rows[name].append(pnl[name])
+        return pd.DataFrame(rows, index=pd.Index(index, name=data.index.name))
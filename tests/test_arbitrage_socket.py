@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('httpx')
+from fastapi.testclient import TestClient
+from fastapi.websockets import WebSocketDisconnect
+
+import api_server
+from price_store import CSVSource, PriceStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    index = pd.date_range(end=pd.Timestamp.today().normalize(), periods=200, freq='D', name='Date')
+    for ticker in ('AAA-USD', 'BBB-USD'):
+        closes = 100 * np.cumprod(1 + rng.normal(0.0, 0.03, len(index)))
+        pd.DataFrame({'Close': closes}, index=index).to_csv(tmp_path / f"{ticker}.csv")
+    monkeypatch.setattr(api_server, 'price_store', PriceStore(root=tmp_path / 'store', source=CSVSource(tmp_path)))
+    with TestClient(api_server.app) as client:
+        yield client
+
+
+def events(client, request):
+    """Messages up to the socket closing, and its close code."""
+    with client.websocket_connect('/ws/arbitrage') as socket:
+        socket.send_json(request)
+        received = []
+        try:
+            while True:
+                received.append(socket.receive_json())
+        except WebSocketDisconnect as e:
+            return received, e.code
+
+
+def test_replays_and_finishes(client):
+    received, code = events(client, {'cryptos': ['AAA-USD', 'BBB-USD']})
+    assert received[0]['event'] == 'ready' and received[0]['pairs'] == 1
+    assert received[-1]['event'] == 'done' and code == 1000
+
+
+@pytest.mark.parametrize('cryptos', [['AAA-USD', 'BOGUS-USD'], ['BOGUS-USD', 'OTHER-USD'], ['AAA-USD', 'AAA-USD']])
+def test_missing_assets_send_an_error(client, cryptos):
+    received, code = events(client, {'cryptos': cryptos})
+    assert [event['event'] for event in received] == ['error']
+    assert code == 1008
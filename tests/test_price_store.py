@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_store import PriceStore
+
+
+class RecordingSource:
+    """Daily closes for ``known`` tickers up to today; records every fetch."""
+
+    def __init__(self, known):
+        self.known = known
+        self.calls = []
+
+    def fetch(self, tickers, start=None, interval='1d'):
+        self.calls.append(tuple(tickers))
+        index = pd.date_range(end=pd.Timestamp.today().normalize(), periods=30, freq='D')
+        return pd.DataFrame({t: np.arange(30.0) + 1 for t in tickers if t in self.known}, index=index)
+
+
+@pytest.fixture
+def source():
+    return RecordingSource({'AAA-USD', 'BBB-USD'})
+
+
+@pytest.fixture
+def store(tmp_path, source):
+    return PriceStore(root=tmp_path, source=source)
+
+
+def test_load_names_missing_tickers(store):
+    with pytest.raises(ValueError, match='BOGUS-USD'):
+        store.load(['AAA-USD', 'BOGUS-USD'])
+    assert list(store.load(['AAA-USD', 'BOGUS-USD'], strict=False).columns) == ['AAA-USD']
+    assert store.load(['AAA-USD', 'BBB-USD']).shape == (30, 2)
+
+
+def test_empty_fetch_is_not_repeated_until_stale(store, source):
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            store.load(['BOGUS-USD'])
+    assert source.calls == [('BOGUS-USD',)]
+
+    store.refresh(['BOGUS-USD'], force=True)
+    assert len(source.calls) == 2
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_quantlab import CryptoQuantLab
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(3)
+    index = pd.date_range('2023-01-01', periods=365, freq='D', name='Date')
+    returns = rng.normal(0.0005, 0.03, size=(len(index), 5))
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=index,
+                        columns=[f"C{i}-USD" for i in range(5)])
+
+
+def backtest_returns(prices, cache):
+    lab = CryptoQuantLab(cache=cache)
+    lab.data = prices
+    totals = []
+    for params in ({}, {'momentum_lookback': 7, 'long_rank': 0.8, 'short_rank': 0.2}, {}):
+        lab.systematic_strategies(**params)
+        totals.append(lab.comprehensive_backtest()['total_return'])
+    return totals
+
+
+def test_dependent_stage_is_keyed_on_its_upstream_arguments(prices):
+    cache = ResultCache()
+    expected = backtest_returns(prices, None)
+    assert expected[0] != expected[1]
+    assert backtest_returns(prices, cache) == expected
+    assert backtest_returns(prices, cache) == expected
+    assert cache.stats()['stages']['backtest'] == {'hits': 4, 'misses': 2}
+
+
+def test_stage_runs_uncached_on_hand_set_upstream_results(prices):
+    uncached = CryptoQuantLab()
+    uncached.data = prices
+    cache = ResultCache()
+    lab = CryptoQuantLab(cache=cache)
+    lab.data = prices
+    lab.results['strategies'] = uncached.systematic_strategies()
+    lab.comprehensive_backtest()
+    assert 'backtest' not in cache.stats()['stages']
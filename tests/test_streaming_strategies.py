@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_quantlab import CryptoQuantLab
+from streaming_strategies import StreamingStrategyEngine
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0005, 0.03, size=(730, 5))
+    index = pd.date_range('2022-01-01', periods=730, freq='D', name='Date')
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=index,
+                        columns=[f"C{i}-USD" for i in range(5)])
+
+
+def batch_strategies(prices, **kwargs):
+    lab = CryptoQuantLab()
+    lab.data = prices
+    return lab.systematic_strategies(**kwargs)
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'momentum_lookback': 7, 'zscore_window': 10, 'z_entry': 1.0},
+])
+def test_streaming_matches_batch(prices, params):
+    batch = batch_strategies(prices, **params)
+    streamed = StreamingStrategyEngine(prices.columns, **params).run(prices)
+
+    momentum = batch['momentum_returns']
+    assert streamed.index.equals(momentum.index)
+    np.testing.assert_allclose(streamed['momentum'], momentum, rtol=0, atol=1e-12)
+    # The batch mean-reversion series starts on the first price bar, where it is 0.
+    np.testing.assert_allclose(streamed['mean_reversion'], batch['mean_reversion_returns'].iloc[1:],
+                               rtol=0, atol=1e-12)
+    np.testing.assert_allclose(streamed['combined'], batch['combined_returns'].dropna(), rtol=0, atol=1e-12)
+
+
+def test_update_feeds_one_bar_at_a_time(prices):
+    engine = StreamingStrategyEngine(prices.columns)
+    positions, pnl = engine.update(prices.iloc[0])
+    assert pnl is None
+    assert not positions['momentum'].any() and not positions['mean_reversion'].any()
+
+    _, pnl = engine.update(prices.iloc[1].to_dict())
+    assert pnl == {'momentum': 0.0, 'mean_reversion': 0.0, 'combined': 0.0}